@@ -0,0 +1,282 @@
+"""
+An asyncio server hosting many parties at once over TCP.
+
+Clients speak line-delimited JSON. A client first sends
+
+    {"type": "join", "name": "Alice", "opponent": "rabelais"}
+
+where the opponent is "rabelais" (the default) or "human", to be paired with
+the next client asking for a human. The server then sends
+
+    {"type": "message", "text": ...}      announcements
+    {"type": "play", "player": ..., "card": "AH"}
+    {"type": "request", "action": ..., "hand": [...], "min": 0, "max": 5}
+    {"type": "error", "text": ...}        after an invalid answer
+    {"type": "end", "winner": ..., "final_score": ..., "score": {...}}
+
+and every request is answered with {"type": "cards", "cards": ["AH", ...]}.
+Actions are "elder_exchange", "younger_exchange", "lead" and "follow"; a
+follow request also carries the "lead" card.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from core.events import CarteBlanche, Exchanged, Pique, Caput, TrickWon, PlayerScore, PartieScore
+from core.game import Partie, Player
+from core.players import Rabelais
+from core.server import Server
+
+
+class Disconnected(Exception):
+    pass
+
+
+class RemotePlayer(Player):
+    """
+    A player on the other end of a connection. Its decisions are coroutines.
+    """
+
+    def __init__(self, name, reader, writer):
+        super().__init__(name)
+        self.reader = reader
+        self.writer = writer
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b'\n')
+
+    def announce(self, message):
+        self.send({'type': 'message', 'text': str(message)})
+
+    def register(self, player, card, silent=False, lead=None):
+        self.send({'type': 'play', 'player': str(player), 'card': card.code})
+
+    async def receive(self):
+        line = await self.reader.readline()
+        if not line:
+            raise Disconnected(self.name)
+        try:
+            return json.loads(line.decode())
+        except ValueError:
+            return {}
+
+    async def ask(self, action, min=1, max=1, **extra):
+        request = {'type': 'request', 'action': action, 'hand': sorted(self.hand), 'min': min, 'max': max}
+        request.update(extra)
+        while True:
+            self.send(request)
+            await self.writer.drain()
+            answer = await self.receive()
+            codes = [code.upper() for code in answer.get('cards', []) if isinstance(code, str)]
+            if answer.get('type') != 'cards':
+                error = 'Please answer with a list of cards.'
+            elif not min <= len(codes) <= max:
+                error = 'Please select between {} and {} cards.'.format(min, max)
+            elif len(set(codes)) != len(codes):
+                error = 'Please select unique cards.'
+            elif not all(code in self.hand for code in codes):
+                error = 'You can only select cards from your hand.'
+            else:
+                return [self.hand[code] for code in codes]
+            self.send({'type': 'error', 'text': error})
+
+    async def get_elder_exchange(self):
+        return await self.ask('elder_exchange', min=0, max=5)
+
+    async def get_younger_exchange(self, max_cards):
+        return await self.ask('younger_exchange', min=0, max=max_cards)
+
+    async def get_lead(self):
+        return (await self.ask('lead'))[0]
+
+    async def get_follow(self, lead_card):
+        while True:
+            card = (await self.ask('follow', lead=lead_card.code))[0]
+            if card.suit == lead_card.suit or not self.has_suit(lead_card.suit):
+                return card
+            self.send({'type': 'error', 'text': 'You must play {}'.format(lead_card.suit)})
+
+
+class Table(Server):
+    """
+    One partie. Decisions are awaited: remote players answer over their
+    connections and computer players think in the server's executor, so no
+    table holds up the others.
+    """
+
+    def __init__(self, player1, player2, executor=None, metrics=None):
+        self.players = {player1, player2}
+        self.partie = Partie(player1, player2)
+        self.executor = executor
+        self.metrics = metrics
+
+    async def decide(self, player, decision, *args):
+        method = getattr(player, decision)
+        start = perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(method):
+                return await method(*args)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe(player, decision, perf_counter() - start)
+
+    async def exchange(self, deal):
+        elder, younger = deal.elder, deal.younger
+
+        if elder.carte_blanche:
+            self.announce(CarteBlanche(elder))
+
+        elder_exchange = await self.decide(elder, 'get_elder_exchange')
+        self.announce(Exchanged(elder, len(elder_exchange)))
+        deal.exchange(elder, elder_exchange)
+
+        if younger.carte_blanche:
+            self.announce(CarteBlanche(younger))
+
+        younger_exchange = await self.decide(younger, 'get_younger_exchange', len(deal.deck))
+        self.announce(Exchanged(younger, len(younger_exchange)))
+        deal.exchange(younger, younger_exchange)
+
+    async def tricks(self, deal):
+        lead = deal.elder
+        announced_pique = False
+        self.announce('---')
+        while lead.hand:
+            follow = (deal.players - {lead}).pop()
+
+            lead_card = await self.decide(lead, 'get_lead')
+            self.register(lead, lead_card)
+            follow_card = await self.decide(follow, 'get_follow', lead_card)
+            self.register(follow, follow_card, lead=lead_card)
+
+            result = deal.play_trick({'player': lead, 'card': lead_card},
+                                     {'player': follow, 'card': follow_card})
+            lead = result['winner']
+            self.announce(TrickWon(lead))
+
+            if not announced_pique and deal.pique:
+                self.announce(Pique(deal.pique))
+                announced_pique = True
+
+            self.announce(PlayerScore(lead, deal.score[lead]))
+
+        if result['caput']:
+            self.announce(Caput(result['caput']))
+
+    async def play_a_hand(self):
+        d = self.partie.new_deal()
+        self.announce('---')
+        with self.phase('deal'):
+            d.deal()
+        with self.phase('exchange'):
+            await self.exchange(d)
+        with self.phase('declarations'):
+            self.declarations(d)
+        with self.phase('tricks'):
+            await self.tricks(d)
+        if self.metrics is not None:
+            self.metrics.count_deal(d)
+        return d.score
+
+    async def play_a_game(self):
+        try:
+            while len(self.partie.deals) < 6:
+                await self.play_a_hand()
+                self.announce(PartieScore(len(self.partie.deals), self.partie.score))
+        finally:
+            self.close_players()
+
+        final_score = self.partie.get_final_score()
+        if self.metrics is not None:
+            self.metrics.count('games')
+        end = {
+            'type': 'end',
+            'winner': str(self.partie.winner),
+            'final_score': final_score,
+            'score': {str(player): score for player, score in self.partie.score.items()}
+        }
+        for player in self.players:
+            if isinstance(player, RemotePlayer):
+                player.send(end)
+        return final_score
+
+
+class AsyncServer:
+    """
+    Accepts connections and seats each one at a table, either against a
+    computer player or against the next client waiting for a human opponent.
+    Computer players run in `executor`, a thread pool by default; players
+    such as Montaigne can spread their own search over processes. Every
+    table records into `metrics`, if given.
+    """
+
+    def __init__(self, computer=Rabelais, executor=None, metrics=None):
+        self.computer = computer
+        self.executor = executor or ThreadPoolExecutor()
+        self.metrics = metrics
+        self.waiting = None
+        self.tables = set()
+
+    async def handle(self, reader, writer):
+        player = None
+        try:
+            player = RemotePlayer('', reader, writer)
+            join = await player.receive()
+            while join.get('type') != 'join' or not isinstance(join.get('name'), str):
+                player.send({'type': 'error', 'text': 'Please join with a name first.'})
+                join = await player.receive()
+            player.name = join['name']
+
+            if join.get('opponent') == 'human':
+                if self.waiting is None or self.waiting[1].done():
+                    self.waiting = (player, asyncio.get_running_loop().create_future())
+                    player.announce('Waiting for an opponent.')
+                    await self.waiting[1]
+                    return
+                opponent, seated = self.waiting
+                self.waiting = None
+                await self.play(Table(opponent, player, self.executor, self.metrics), seated)
+            else:
+                await self.play(Table(player, self.computer(self.computer.__name__), self.executor, self.metrics))
+        except (Disconnected, ConnectionError):
+            pass
+        finally:
+            if self.waiting and self.waiting[0] is player:
+                self.waiting = None
+            writer.close()
+
+    async def play(self, table, seated=None):
+        self.tables.add(table)
+        try:
+            await table.play_a_game()
+        except (Disconnected, ConnectionError) as e:
+            table.announce('{} left the table.'.format(e))
+        finally:
+            self.tables.discard(table)
+            for player in table.players:
+                if isinstance(player, RemotePlayer):
+                    try:
+                        await player.writer.drain()
+                    except ConnectionError:
+                        pass
+            if seated and not seated.done():
+                seated.set_result(None)
+
+    async def serve(self, host='127.0.0.1', port=8750):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Host piquet tables over TCP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8750)
+    args = parser.parse_args()
+
+    asyncio.run(AsyncServer().serve(args.host, args.port))
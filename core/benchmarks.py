@@ -0,0 +1,276 @@
+"""
+Timings of the engine's hot paths, with baselines to compare them against.
+
+Each benchmark prepares fresh, seeded state outside the timer, then times a
+batch of operations; one sample is the mean time per operation over a batch.
+Results can be saved as a JSON baseline and later runs compared against it
+with Welch's t-test, so that a change is only called a regression when it is
+both large enough to matter and unlikely to be noise.
+
+    python -m core.benchmarks --save baseline.json
+    python -m core.benchmarks --compare baseline.json
+"""
+import json
+import platform
+import random
+from math import sqrt, lgamma, exp, log
+from statistics import mean, stdev
+from timeit import default_timer
+
+from core.game import Partie, Category, DECK
+from core.players import Rabelais
+from core.server import Server
+from core.tricks import TrickState, cards
+
+
+class QuietServer(Server):
+    """
+    A server between two Rabelais players, who ignore announcements.
+    """
+
+    def __init__(self):
+        player1 = Rabelais('Barry Lyndon')
+        player2 = Rabelais('Rabelais')
+        self.players = {player1, player2}
+        self.partie = Partie(player1, player2)
+
+
+def new_deals(rng, count, exchange=True, declare=False):
+    """
+    Deals of their own parties, dealt and optionally exchanged and scored.
+    """
+    deals = []
+    for _ in range(count):
+        server = QuietServer()
+        deal = server.partie.new_deal()
+        rng.shuffle(deal.deck.cards)
+        deal.order = list(deal.deck.cards)
+        deal.deal()
+        if exchange:
+            deal.exchange(deal.elder, deal.elder.get_elder_exchange())
+            deal.exchange(deal.younger, deal.younger.get_younger_exchange(len(deal.deck)))
+        if declare:
+            deal.score_declarations()
+        deals.append((server, deal))
+    return deals
+
+
+def random_plays(rng, deal):
+    """
+    A legal run of tricks for a deal, as (lead, follow) cards.
+    """
+    state = TrickState([deal.elder.mask, deal.younger.mask], 0)
+    plays = []
+    while not state.finished:
+        lead = rng.choice(cards(state.moves()))
+        state.play(lead)
+        follow = rng.choice(cards(state.moves()))
+        state.play(follow)
+        plays.append((DECK[lead], DECK[follow]))
+    return plays
+
+
+def declaration_benchmark(category):
+    def setup(rng):
+        players = [deal.elder for _, deal in new_deals(rng, 200, exchange=False)]
+        method = 'get_' + category
+        return lambda: [getattr(player, method)() for player in players], len(players)
+    return setup
+
+
+def evaluate_hand(rng):
+    players = [deal.elder for _, deal in new_deals(rng, 100, exchange=False)]
+
+    def run():
+        for player in players:
+            player.declaration_cache = {}
+            player.evaluate_hand()
+    return run, len(players)
+
+
+def first_tricks(rng, count):
+    """
+    Exchanged deals with a few tricks already played, so that the players
+    have seen cards to reason about.
+    """
+    deals = []
+    for server, deal in new_deals(rng, count):
+        lead, follow = deal.elder, deal.younger
+        for _ in range(rng.randrange(6)):
+            lead_card = lead.get_lead()
+            server.register(lead, lead_card, silent=True)
+            follow_card = follow.get_follow(lead_card)
+            server.register(follow, follow_card, silent=True, lead=lead_card)
+            result = deal.play_trick({'player': lead, 'card': lead_card}, {'player': follow, 'card': follow_card})
+            if result['winner'] is not lead:
+                lead, follow = follow, lead
+        deals.append((lead, follow))
+    return deals
+
+
+def get_lead(rng):
+    leads = [lead for lead, _ in first_tricks(rng, 100)]
+    return lambda: [player.get_lead() for player in leads], len(leads)
+
+
+def get_follow(rng):
+    follows = [(follow, lead.get_lead()) for lead, follow in first_tricks(rng, 100)]
+    return lambda: [player.get_follow(lead_card) for player, lead_card in follows], len(follows)
+
+
+def play_trick(rng):
+    deals = [(deal, random_plays(rng, deal)) for _, deal in new_deals(rng, 50, declare=True)]
+
+    def run():
+        for deal, plays in deals:
+            lead, follow = deal.elder, deal.younger
+            for lead_card, follow_card in plays:
+                result = deal.play_trick({'player': lead, 'card': lead_card},
+                                         {'player': follow, 'card': follow_card})
+                if result['winner'] is not lead:
+                    lead, follow = follow, lead
+    return run, 12 * len(deals)
+
+
+def declarations(rng):
+    deals = new_deals(rng, 100)
+    return lambda: [server.declarations(deal) for server, deal in deals], len(deals)
+
+
+def play_a_game(rng):
+    servers = [QuietServer() for _ in range(5)]
+    return lambda: [server.play_a_game() for server in servers], len(servers)
+
+
+BENCHMARKS = {
+    'point': declaration_benchmark(Category.POINT),
+    'sequences': declaration_benchmark(Category.SEQUENCES),
+    'sets': declaration_benchmark(Category.SETS),
+    'evaluate_hand': evaluate_hand,
+    'get_lead': get_lead,
+    'get_follow': get_follow,
+    'play_trick': play_trick,
+    'declarations': declarations,
+    'play_a_game': play_a_game,
+}
+
+
+def measure(setup, samples=20, seed=0, warmup=1):
+    """
+    Seconds per operation, one sample per freshly prepared batch. The first
+    `warmup` batches are run but not counted.
+    """
+    times = []
+    for i in range(warmup + samples):
+        random.seed(seed + i)
+        run, ops = setup(random.Random(seed + i))
+        start = default_timer()
+        run()
+        times.append((default_timer() - start) / ops)
+    return times[warmup:]
+
+
+def run_benchmarks(names=None, samples=20, seed=0):
+    results = {}
+    for name in names or BENCHMARKS:
+        times = measure(BENCHMARKS[name], samples, seed)
+        results[name] = {'mean': mean(times), 'stdev': stdev(times), 'samples': times}
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'benchmarks': results
+    }
+
+
+def incomplete_beta(x, a, b):
+    """
+    The regularised incomplete beta function, by its continued fraction.
+    """
+    if x <= 0 or x >= 1:
+        return max(0.0, min(1.0, x))
+    if x > (a + 1) / (a + b + 2):
+        return 1 - incomplete_beta(1 - x, b, a)
+    front = exp(lgamma(a + b) - lgamma(a) - lgamma(b) + a * log(x) + b * log(1 - x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 200):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return front * f
+
+
+def welch_test(first, second):
+    """
+    Welch's t-test for a difference in means. Returns t and the two-sided
+    p-value.
+    """
+    v1, v2 = stdev(first) ** 2 / len(first), stdev(second) ** 2 / len(second)
+    if not v1 + v2:
+        return 0.0, 1.0 if mean(first) == mean(second) else 0.0
+    t = (mean(second) - mean(first)) / sqrt(v1 + v2)
+    df = (v1 + v2) ** 2 / (v1 ** 2 / (len(first) - 1) + v2 ** 2 / (len(second) - 1))
+    return t, incomplete_beta(df / (df + t * t), df / 2, 0.5)
+
+
+def compare(baseline, results, alpha=0.01, threshold=0.05):
+    """
+    Compare results against a baseline, benchmark by benchmark. A benchmark
+    has regressed if it is more than `threshold` slower and the difference is
+    significant at `alpha`, and improved likewise if it is faster.
+    """
+    report = {}
+    for name, result in results['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if not base:
+            continue
+        change = result['mean'] / base['mean'] - 1
+        t, p = welch_test(base['samples'], result['samples'])
+        status = 'unchanged'
+        if p < alpha and abs(change) > threshold:
+            status = 'slower' if change > 0 else 'faster'
+        report[name] = {'change': change, 'p': p, 'status': status}
+    return report
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Time the engine and compare it against a baseline.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run: {}'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write the results to this baseline')
+    parser.add_argument('--compare', help='compare the results with this baseline')
+    parser.add_argument('--alpha', type=float, default=0.01)
+    parser.add_argument('--threshold', type=float, default=0.05)
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: {}'.format(name))
+
+    results = run_benchmarks(args.names, args.samples, args.seed)
+    report = {}
+    if args.compare:
+        with open(args.compare) as f:
+            report = compare(json.load(f), results, args.alpha, args.threshold)
+
+    for name, result in results['benchmarks'].items():
+        line = '{:<14} {:>10.2f} us +- {:.2f}'.format(name, result['mean'] * 1e6, result['stdev'] * 1e6)
+        if name in report:
+            line += '  {change:+.1%} (p={p:.3f}) {status}'.format(**report[name])
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if any(entry['status'] == 'slower' for entry in report.values()):
+        raise SystemExit(1)
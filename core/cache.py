@@ -0,0 +1,109 @@
+"""
+Decisions worked out once and kept, in memory and on disk.
+
+A DecisionCache maps whole-number keys (up to 64 bits) to whole-number
+decisions (up to 32 bits, such as a discard mask). Lookups try a bounded
+in-process LRU first, then a sorted table on disk, memory-mapped read-only
+so that every worker process shares the same pages, and only then work the
+decision out. Decisions worked out here are kept as `pending` until they
+are saved, which merges them into the table for the next run.
+
+A table is a .npy file of two uint64 rows: the sorted keys, and their
+decisions.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+def read_table(path):
+    if path and os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    return np.zeros((2, 0), dtype=np.uint64)
+
+
+def write_table(path, entries):
+    """
+    Merge a dict of new entries into the table at `path`, replacing it
+    whole so that readers never see half a table.
+    """
+    table = read_table(path)
+    merged = dict(zip(table[0].tolist(), table[1].tolist()))
+    merged.update(entries)
+    keys = np.array(sorted(merged), dtype=np.uint64)
+    updated = np.array([keys, [merged[key] for key in keys.tolist()]], dtype=np.uint64).reshape(2, -1)
+
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        np.save(f, updated)
+    os.replace(temporary, path)
+
+
+class DecisionCache:
+
+    def __init__(self, path=None, size=1 << 16):
+        self.path = path
+        self.size = size
+        self.table = read_table(path)
+        self.recent = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.table_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.table.shape[1] + len(self.pending)
+
+    def get(self, key):
+        """
+        The cached decision for `key`, or None.
+        """
+        try:
+            value = self.recent[key]
+        except KeyError:
+            pass
+        else:
+            self.recent.move_to_end(key)
+            self.hits += 1
+            return value
+
+        keys = self.table[0]
+        i = int(np.searchsorted(keys, np.uint64(key)))
+        if i < len(keys) and keys[i] == key:
+            self.table_hits += 1
+            value = int(self.table[1, i])
+            self.remember(key, value)
+            return value
+        return None
+
+    def remember(self, key, value):
+        self.recent[key] = value
+        if len(self.recent) > self.size:
+            self.recent.popitem(last=False)
+
+    def lookup(self, key, decide):
+        """
+        The decision for `key`, calling `decide()` to work it out if it
+        isn't cached.
+        """
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+            value = self.pending[key] = decide()
+            self.remember(key, value)
+        return value
+
+    def cache_info(self):
+        return {'hits': self.hits, 'table_hits': self.table_hits, 'misses': self.misses,
+                'recent': len(self.recent), 'table': self.table.shape[1]}
+
+    def save(self, path=None):
+        """
+        Merge the pending decisions into the table on disk, and read it again.
+        """
+        path = path or self.path
+        write_table(path, self.pending)
+        self.pending = {}
+        self.path = path
+        self.table = read_table(path)
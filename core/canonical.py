@@ -0,0 +1,102 @@
+"""
+Hands, pairs of hands and trick states up to relabelling the suits.
+
+No suit plays a special part in piquet, so a hand scores and plays just as
+any of its 23 twins with the suits swapped round does. The canonical twin
+has its suits' holdings in descending order; it comes with the permutation
+that makes it, so that a decision about the canonical hand can be carried
+back to the hand itself. Several masks are made canonical together, their
+suits ordered by the holdings of the first, then of the second, and so on.
+
+A permutation is a tuple of four suit numbers (in Suit.suits order): suit i
+of the canonical hand is suit permutation[i] of the original.
+"""
+import numpy as np
+
+from core.game import SUIT_SHIFTS
+
+SHIFTS = tuple(SUIT_SHIFTS.values())
+
+
+def holdings(mask):
+    return [(mask >> shift) & 0xFF for shift in SHIFTS]
+
+
+def permute(mask, permutation):
+    """
+    The mask with its suits relabelled to the canonical ones.
+    """
+    return sum(((mask >> SHIFTS[suit]) & 0xFF) << SHIFTS[i] for i, suit in enumerate(permutation))
+
+
+def restore(mask, permutation):
+    """
+    A canonical mask with its suits relabelled back to the original ones.
+    """
+    return sum(((mask >> SHIFTS[i]) & 0xFF) << SHIFTS[suit] for i, suit in enumerate(permutation))
+
+
+def permute_card(index, permutation):
+    return permutation.index(index >> 3) << 3 | index & 7
+
+
+def restore_card(index, permutation):
+    return permutation[index >> 3] << 3 | index & 7
+
+
+def canonical(*masks):
+    """
+    The canonical twins of `masks`, relabelled together, and the permutation.
+    """
+    suits = [tuple((mask >> shift) & 0xFF for mask in masks) for shift in SHIFTS]
+    permutation = tuple(sorted(range(4), key=suits.__getitem__, reverse=True))
+    return tuple(permute(mask, permutation) for mask in masks), permutation
+
+
+def canonical_hand(mask):
+    """
+    The canonical hand of `mask` and the permutation that makes it.
+    """
+    suits = holdings(mask)
+    permutation = tuple(sorted(range(4), key=suits.__getitem__, reverse=True))
+    return permute(mask, permutation), permutation
+
+
+def canonical_pair(first, second):
+    """
+    canonical(first, second), made quicker for the solvers' inner loops.
+    """
+    suits = [(first >> shift & 0xFF) << 8 | second >> shift & 0xFF for shift in SHIFTS]
+    permutation = tuple(sorted(range(4), key=suits.__getitem__, reverse=True))
+    a, b, c, d = permutation
+    return ((suits[a] >> 8 | (suits[b] >> 8) << 8 | (suits[c] >> 8) << 16 | (suits[d] >> 8) << 24,
+             suits[a] & 0xFF | (suits[b] & 0xFF) << 8 | (suits[c] & 0xFF) << 16 | (suits[d] & 0xFF) << 24),
+            permutation)
+
+
+def canonical_state(info):
+    """
+    The canonical key of a trick state, as Montaigne.information describes
+    it, and the permutation. The card led and the suits the opponent is out
+    of are relabelled with the hands, and the rest of the state is kept.
+    """
+    lead = info['lead']
+    (hand, unseen, led, excluded), permutation = canonical(
+        info['hand'], info['unseen'], 0 if lead is None else 1 << lead, info['excluded'])
+    key = (hand, unseen, excluded, None if lead is None else led.bit_length() - 1, info['opponent_size'],
+           info['leader'], tuple(info['score']), tuple(info['tricks']), info['pique'])
+    return key, permutation
+
+
+def canonical_arrays(*arrays):
+    """
+    canonical() for arrays of masks, a row at a time, with up to seven
+    arrays. Returns the canonical arrays and an (N, 4) array of permutations.
+    """
+    held = [np.stack([(np.asarray(array, dtype=np.uint32) >> np.uint32(shift)) & np.uint32(0xFF) for shift in SHIFTS],
+                     axis=-1) for array in arrays]
+    suits = sum(suit.astype(np.int64) << (8 * (len(held) - 1 - k)) for k, suit in enumerate(held))
+    permutation = np.argsort(-suits, axis=-1, kind='stable')
+    rows = np.arange(len(permutation))[:, None]
+    shifts = np.array(SHIFTS, dtype=np.uint32)
+    return [np.bitwise_or.reduce(suit[rows, permutation] << shifts, axis=-1) for suit in held], permutation
@@ -0,0 +1,165 @@
+"""
+Training data from computer play, as fixed-width NumPy shards.
+
+Every decision of a finished deal becomes one record (see RECORD): the
+player's hand and the cards they have seen, as Rabelais's tracker counts
+them, the decision and the action taken, and how the deal ended for them.
+A ShardWriter takes finished deals wherever a RecordWriter does and writes
+the records out in .npy shards of a fixed number of records. A Dataset
+memory-maps a directory of shards, so that any record can be read without
+loading the rest and batches can be drawn in any order.
+"""
+import os
+import re
+
+import numpy as np
+
+DECISIONS = ('get_elder_exchange', 'get_younger_exchange', 'get_lead', 'get_follow')
+ELDER_EXCHANGE, YOUNGER_EXCHANGE, LEAD, FOLLOW = range(len(DECISIONS))
+
+# Shards are named by their writer's prefix and their number.
+SHARD_NAME = re.compile(r'(.+)-(\d{5,})\.npy')
+
+# An exchange's action is the mask of the cards discarded; a play's is the
+# index of the card played. Scores are the deal's, the player's first.
+RECORD = np.dtype([
+    ('seat', 'u1'),
+    ('elder', '?'),
+    ('decision', 'u1'),
+    ('lead', 'i1'),
+    ('hand', '<u4'),
+    ('seen', '<u4'),
+    ('action', '<u4'),
+    ('score', '<i2', (2,))
+])
+
+
+def decision_records(deal, seats):
+    """
+    The records of every decision in a finished deal, in the order they
+    were made. `seats` is the pair of players in a fixed order.
+    """
+    order = [card.index for card in deal.order]
+    players = (deal.elder, deal.younger)
+    hands = [sum(1 << i for i in order[31:8:-2]), sum(1 << i for i in order[30:7:-2])]
+    seen = list(hands)
+    talon = order[7::-1]
+    rows = []
+
+    for mover, decision in enumerate((ELDER_EXCHANGE, YOUNGER_EXCHANGE)):
+        discards = sum(card.bit for card in deal.discards[players[mover]])
+        rows.append((mover, decision, -1, hands[mover], seen[mover], discards))
+        drawn = sum(1 << i for i in talon[:len(deal.discards[players[mover]])])
+        del talon[:len(deal.discards[players[mover]])]
+        hands[mover] = hands[mover] & ~discards | drawn
+        seen[mover] |= drawn
+
+    leader = 0
+    for lead, follow in deal.plays:
+        follower = 1 - leader
+        rows.append((leader, LEAD, -1, hands[leader], seen[leader], lead.index))
+        seen[follower] |= lead.bit
+        rows.append((follower, FOLLOW, lead.index, hands[follower], seen[follower], follow.index))
+        seen[leader] |= follow.bit
+        hands[leader] &= ~lead.bit
+        hands[follower] &= ~follow.bit
+        if follow.suit == lead.suit and follow.value > lead.value:
+            leader = follower
+
+    seat = [seats.index(player) for player in players]
+    scores = [(deal.score[deal.elder], deal.score[deal.younger]), (deal.score[deal.younger], deal.score[deal.elder])]
+    return np.array([(seat[mover], mover == 0, decision, lead, hand, mask, action, scores[mover])
+                     for mover, decision, lead, hand, mask, action in rows], dtype=RECORD)
+
+
+class ShardWriter:
+    """
+    Writes the decisions of finished deals to `directory` in shards of
+    `shard_size` records, named `prefix` and the shard number. Writers with
+    different prefixes can share a directory, and a writer whose prefix is
+    already there numbers its shards on from the ones before.
+    """
+
+    def __init__(self, directory, shard_size=1 << 16, prefix='shard'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer = np.empty(shard_size, dtype=RECORD)
+        self.size = 0
+        numbers = [int(match.group(2)) for match in map(SHARD_NAME.fullmatch, os.listdir(directory))
+                   if match and match.group(1) == prefix]
+        self.shards = max(numbers, default=-1) + 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, deal, seats):
+        records = decision_records(deal, seats)
+        while len(records):
+            taken = records[:len(self.buffer) - self.size]
+            self.buffer[self.size:self.size + len(taken)] = taken
+            self.size += len(taken)
+            records = records[len(taken):]
+            if self.size == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        if self.size:
+            path = os.path.join(self.directory, '{}-{:05d}.npy'.format(self.prefix, self.shards))
+            np.save(path, self.buffer[:self.size])
+            self.shards += 1
+            self.size = 0
+
+    def close(self):
+        self.flush()
+
+
+class Dataset:
+    """
+    Every shard in a directory, memory-mapped read-only and indexed as one
+    array of records. Other files in the directory are left alone.
+    """
+
+    def __init__(self, directory):
+        names = sorted(name for name in os.listdir(directory) if SHARD_NAME.fullmatch(name))
+        self.shards = [np.load(os.path.join(directory, name), mmap_mode='r') for name in names]
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        """
+        One record, or a copy of the records at an array of indices.
+        """
+        if np.ndim(index) == 0:
+            if not -len(self) <= index < len(self):
+                raise IndexError(index)
+            index %= len(self)
+            shard = np.searchsorted(self.offsets, index, side='right') - 1
+            return self.shards[shard][index - self.offsets[shard]]
+
+        index = np.asarray(index)
+        if np.any((index < -len(self)) | (index >= len(self))):
+            raise IndexError('Indices must be from -{0} to {0}, exclusive.'.format(len(self)))
+        index = index % max(len(self), 1)
+        shard = np.searchsorted(self.offsets, index, side='right') - 1
+        records = np.empty(len(index), dtype=RECORD)
+        for s in np.unique(shard):
+            chosen = shard == s
+            records[chosen] = self.shards[s][index[chosen] - self.offsets[s]]
+        return records
+
+    def batches(self, size, rng=None, shuffle=True):
+        """
+        Every record once, in batches of `size`, in a random order unless
+        `shuffle` is off.
+        """
+        indices = np.arange(len(self))
+        if shuffle:
+            (rng or np.random.default_rng()).shuffle(indices)
+        for start in range(0, len(indices), size):
+            yield self[indices[start:start + size]]
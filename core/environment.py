@@ -0,0 +1,239 @@
+"""
+Many deals played at once, for self-play training.
+
+VectorEnv holds N tables in NumPy arrays and steps them all together, in the
+style of a Gym vector environment. Each table plays one deal at a time:
+
+    ELDER_EXCHANGE    the elder discards up to five cards
+    YOUNGER_EXCHANGE  the younger discards up to what is left of the talon
+    LEAD, FOLLOW      twelve tricks
+
+Declarations are scored as the younger's exchange is made. An exchange
+action is the mask of cards to discard; a play is a card index, as in
+core.game.DECK. Scoring is that of Deal.deal, Deal.score_declarations and
+Deal.play_trick, and a deal is dealt from a deck order just as Deal deals
+it, so any table can be checked against the Python game.
+
+Finished tables are dealt again straight away; the final scores of the deal
+that ended are in the step's info.
+"""
+import numpy as np
+
+from core import vectorized
+from core.game import COURTS_MASK, SUIT_MASKS, Suit
+
+ELDER_EXCHANGE, YOUNGER_EXCHANGE, LEAD, FOLLOW = range(4)
+
+BITS = np.left_shift(np.uint32(1), np.arange(32, dtype=np.uint32))
+SUIT_OF = np.array([SUIT_MASKS[suit] for suit in Suit.suits for _ in range(8)], dtype=np.uint32)
+BYTE = np.uint32(0xFF)
+
+
+def popcount(masks):
+    return sum(vectorized.LENGTHS[(masks >> np.uint32(shift)) & BYTE] for shift in (0, 8, 16, 24))
+
+
+def unpack(masks):
+    """
+    (N,) masks as (N, 32) booleans.
+    """
+    return (masks[:, None] & BITS) != 0
+
+
+def pack(cards):
+    return np.bitwise_or.reduce(np.where(cards >= 0, BITS[np.maximum(cards, 0)], np.uint32(0)), axis=1)
+
+
+class VectorEnv:
+
+    def __init__(self, tables, seed=None, autoreset=True):
+        self.n = tables
+        self.rng = np.random.default_rng(seed)
+        self.autoreset = autoreset
+        self.hands = np.zeros((tables, 2), dtype=np.uint32)
+        self.discards = np.zeros((tables, 2), dtype=np.uint32)
+        self.talon = np.zeros((tables, 8), dtype=np.int64)
+        self.drawn = np.zeros(tables, dtype=np.int64)
+        self.score = np.zeros((tables, 2), dtype=np.int32)
+        self.tricks = np.zeros((tables, 2), dtype=np.int32)
+        self.phase = np.zeros(tables, dtype=np.int8)
+        self.leader = np.zeros(tables, dtype=np.int64)
+        self.lead = np.full(tables, -1, dtype=np.int64)
+        self.pique = np.zeros(tables, dtype=bool)
+        self.played = np.zeros(tables, dtype=np.uint32)
+
+    def reset(self, tables=None, orders=None):
+        """
+        Deal again at the given tables (all by default), from (k, 32) deck
+        orders in Deal's convention, or shuffled ones. Returns the
+        observations of every table.
+        """
+        rows = np.arange(self.n) if tables is None else np.asarray(tables)
+        if orders is None:
+            orders = self.rng.permuted(np.tile(np.arange(32), (len(rows), 1)), axis=1)
+        orders = np.asarray(orders, dtype=np.int64)
+
+        # Deal pops from the end of the deck, the elder first.
+        self.hands[rows, 0] = pack(orders[:, 31:8:-2])
+        self.hands[rows, 1] = pack(orders[:, 30:7:-2])
+        self.talon[rows] = orders[:, 7::-1]
+        self.drawn[rows] = 0
+        self.discards[rows] = 0
+        self.tricks[rows] = 0
+        self.phase[rows] = ELDER_EXCHANGE
+        self.leader[rows] = 0
+        self.lead[rows] = -1
+        self.pique[rows] = False
+        self.played[rows] = 0
+
+        elder_blanche = (self.hands[rows, 0] & np.uint32(COURTS_MASK)) == 0
+        younger_blanche = ~elder_blanche & ((self.hands[rows, 1] & np.uint32(COURTS_MASK)) == 0)
+        self.score[rows, 0] = 10 * elder_blanche
+        self.score[rows, 1] = 10 * younger_blanche
+        return self.observe()
+
+    def seat(self):
+        """
+        Who is to move at each table: 0 for the elder, 1 for the younger.
+        """
+        return np.where(self.phase == ELDER_EXCHANGE, 0,
+                        np.where(self.phase == YOUNGER_EXCHANGE, 1,
+                                 np.where(self.phase == LEAD, self.leader, 1 - self.leader)))
+
+    def legal_masks(self):
+        """
+        The cards each table's player may discard or play, as masks.
+        """
+        hand = self.hands[np.arange(self.n), self.seat()]
+        following = self.phase == FOLLOW
+        suited = hand & SUIT_OF[np.maximum(self.lead, 0)]
+        return np.where(following & (suited != 0), suited, hand)
+
+    def max_discards(self):
+        return np.where(self.phase == ELDER_EXCHANGE, 5,
+                        np.where(self.phase == YOUNGER_EXCHANGE, 8 - self.drawn, 0))
+
+    def observe(self):
+        seat = self.seat()
+        rows = np.arange(self.n)
+        return {
+            'phase': self.phase.copy(),
+            'seat': seat,
+            'hand': unpack(self.hands[rows, seat]),
+            'discards': unpack(self.discards[rows, seat]),
+            'played': unpack(self.played),
+            'lead': self.lead.copy(),
+            'score': self.score.copy(),
+            'tricks': self.tricks.copy(),
+            'legal': unpack(self.legal_masks()),
+            'max_discards': self.max_discards()
+        }
+
+    def step(self, actions):
+        """
+        Apply one action at every table: a discard mask while exchanging, a
+        card index while playing. Returns the observations, each seat's
+        points from this step as (N, 2) rewards, which tables finished a deal,
+        and an info dict with those tables' final scores and tricks.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        before = self.score.copy()
+        legal = self.legal_masks()
+
+        exchanging = self.phase <= YOUNGER_EXCHANGE
+        discards = actions.astype(np.uint32)
+        if np.any(exchanging & (((discards & ~legal) != 0) | (popcount(discards) > self.max_discards()))):
+            raise ValueError('Exchanges must discard cards from the hand, up to the number allowed.')
+        playing = ~exchanging
+        if np.any(playing & ((actions < 0) | (actions > 31) | ((legal & BITS[actions & 31]) == 0))):
+            raise ValueError('Plays must be legal cards.')
+
+        self.exchange(np.flatnonzero(exchanging), discards[exchanging])
+        self.play(np.flatnonzero(playing), actions[playing])
+
+        done = (self.hands[:, 0] == 0) & (self.hands[:, 1] == 0)
+        rewards = self.score - before
+        info = {'final_score': np.where(done[:, None], self.score, 0),
+                'tricks': np.where(done[:, None], self.tricks, 0)}
+        if self.autoreset and done.any():
+            self.reset(np.flatnonzero(done))
+        return self.observe(), rewards, done, info
+
+    def exchange(self, rows, discards):
+        if not len(rows):
+            return
+        seat = self.phase[rows].astype(np.int64)
+        count = popcount(discards).astype(np.int64)
+        positions = np.arange(8)
+        taken = (positions >= self.drawn[rows, None]) & (positions < (self.drawn[rows] + count)[:, None])
+        drawn = pack(np.where(taken, self.talon[rows], -1))
+
+        self.hands[rows, seat] = (self.hands[rows, seat] & ~discards) | drawn
+        self.discards[rows, seat] = discards
+        self.drawn[rows] += count
+        self.phase[rows] += 1
+
+        declaring = rows[seat == 1]
+        if len(declaring):
+            result = vectorized.score_declarations(self.hands[declaring, 0], self.hands[declaring, 1],
+                                                   self.score[declaring, 0], self.score[declaring, 1])
+            self.score[declaring, 0] = result['elder']
+            self.score[declaring, 1] = result['younger']
+            self.pique[declaring] = result['repique'] != 0
+
+    def play(self, rows, cards):
+        if not len(rows):
+            return
+        bits = BITS[cards]
+        mover = np.where(self.phase[rows] == LEAD, self.leader[rows], 1 - self.leader[rows])
+        self.hands[rows, mover] &= ~bits
+        self.played[rows] |= bits
+
+        leading = self.phase[rows] == LEAD
+        self.lead[rows[leading]] = cards[leading]
+        self.phase[rows[leading]] = FOLLOW
+
+        rows, follow = rows[~leading], cards[~leading]
+        if not len(rows):
+            return
+        leader, lead = self.leader[rows], self.lead[rows]
+        beaten = (SUIT_OF[follow] == SUIT_OF[lead]) & (follow > lead)
+        winner = np.where(beaten, 1 - leader, leader)
+        loser = 1 - winner
+
+        self.score[rows, leader] += 1
+        self.score[rows, winner] += beaten
+        self.tricks[rows, winner] += 1
+
+        piqued = ~self.pique[rows] & (self.score[rows, winner] >= 30) & (self.score[rows, loser] == 0)
+        self.score[rows, winner] += 30 * piqued
+        self.pique[rows] |= piqued
+
+        last = self.hands[rows, leader] == 0
+        if last.any():
+            ended, ended_winner = rows[last], winner[last]
+            won = self.tricks[ended, ended_winner]
+            most = np.argmax(self.tricks[ended], axis=1)
+            self.score[ended, ended_winner] += 1 + 40 * (won == 12)
+            self.score[ended, most] += 10 * ((won != 12) & (won != 6))
+
+        self.leader[rows] = winner
+        self.lead[rows] = -1
+        self.phase[rows] = LEAD
+
+
+def random_actions(observation, rng):
+    """
+    A uniformly random legal action for every table: a random number of
+    random discards while exchanging, a random legal card while playing.
+    """
+    legal = observation['legal']
+    priorities = np.where(legal, rng.random(legal.shape), -1)
+    cards = np.argmax(priorities, axis=1)
+
+    counts = rng.integers(0, observation['max_discards'] + 1)
+    ranks = np.argsort(np.argsort(-priorities, axis=1), axis=1)
+    chosen = legal & (ranks < counts[:, None])
+    discards = (chosen * BITS.astype(np.int64)).sum(axis=1)
+
+    return np.where(observation['phase'] <= YOUNGER_EXCHANGE, discards, cards)
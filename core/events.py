@@ -0,0 +1,189 @@
+"""
+What happens in a partie, as events rather than messages.
+
+Servers announce events to the players that listen and publish them to an
+EventBus, if they have one. An event is a small object holding what
+happened; its text is only made when something calls str() on it, so
+announcements nobody reads cost next to nothing.
+"""
+
+
+class Event:
+    __slots__ = ()
+    template = ''
+
+    def render(self):
+        return self.template.format(*[getattr(self, name) for name in self.__slots__])
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(repr(getattr(self, name)) for name in self.__slots__))
+
+
+class CarteBlanche(Event):
+    __slots__ = ('player',)
+    template = '{} is carte blanche.'
+
+    def __init__(self, player):
+        self.player = player
+
+
+class Exchanged(Event):
+    __slots__ = ('player', 'count')
+    template = '{} exchanges {} cards.'
+
+    def __init__(self, player, count):
+        self.player = player
+        self.count = count
+
+
+class NotGood(Event):
+    __slots__ = ('player', 'category')
+    template = '{} is not good in {}.'
+
+    def __init__(self, player, category):
+        self.player = player
+        self.category = category
+
+
+class Declared(Event):
+    __slots__ = ('player', 'declaration')
+    template = '{} has {}.'
+
+    def __init__(self, player, declaration):
+        self.player = player
+        self.declaration = declaration
+
+
+class Answered(Event):
+    __slots__ = ('good',)
+    template = "That's {}."
+
+    def __init__(self, good):
+        self.good = good
+
+
+class DeclarationWon(Event):
+    __slots__ = ('player', 'category', 'declaration')
+    template = '{} wins {} with {}.'
+
+    def __init__(self, player, category, declaration):
+        self.player = player
+        self.category = category
+        self.declaration = declaration
+
+    def render(self):
+        return self.template.format(self.player, self.category, self.declaration.all_results)
+
+
+class Repique(Event):
+    __slots__ = ('player',)
+    template = '{} is repique.'
+
+    def __init__(self, player):
+        self.player = player
+
+
+class Pique(Event):
+    __slots__ = ('player',)
+    template = '{} is pique.'
+
+    def __init__(self, player):
+        self.player = player
+
+
+class Caput(Event):
+    __slots__ = ('player',)
+    template = '{} is caput.'
+
+    def __init__(self, player):
+        self.player = player
+
+
+class CardPlayed(Event):
+    __slots__ = ('player', 'card', 'lead')
+    template = '{} plays {}.'
+
+    def __init__(self, player, card, lead=None):
+        self.player = player
+        self.card = card
+        self.lead = lead
+
+    def render(self):
+        return self.template.format(self.player, self.card)
+
+
+class TrickWon(Event):
+    __slots__ = ('player',)
+    template = '{} takes the trick.'
+
+    def __init__(self, player):
+        self.player = player
+
+
+class PlayerScore(Event):
+    __slots__ = ('player', 'score')
+    template = '{}: {}'
+
+    def __init__(self, player, score):
+        self.player = player
+        self.score = score
+
+
+class DealScore(Event):
+    __slots__ = ('score',)
+    template = '{}'
+
+    def __init__(self, score):
+        # A copy, since the deal goes on scoring after this is announced.
+        self.score = dict(score)
+
+
+class PartieScore(Event):
+    __slots__ = ('deals', 'score')
+    template = 'After {} deal(s), the score is {}'
+
+    def __init__(self, deals, score):
+        self.deals = deals
+        self.score = dict(score)
+
+
+class PartieWon(Event):
+    __slots__ = ('winner', 'loser', 'final_score', 'rubicon')
+
+    def __init__(self, winner, loser, final_score, rubicon):
+        self.winner = winner
+        self.loser = loser
+        self.final_score = final_score
+        self.rubicon = rubicon
+
+    def render(self):
+        if self.rubicon:
+            return '{} crossed the rubicon and {} won with {}.'.format(self.loser, self.winner, self.final_score)
+        return '{} failed to cross the rubicon and {} won with {}.'.format(self.loser, self.winner, self.final_score)
+
+
+class EventBus:
+    """
+    Calls its subscribers with the events they ask for: all of them, or only
+    those of the given event classes.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def __bool__(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, callback, *kinds):
+        self.subscribers.append((callback, kinds or (Event,)))
+
+    def unsubscribe(self, callback):
+        self.subscribers = [(c, kinds) for c, kinds in self.subscribers if c != callback]
+
+    def publish(self, event):
+        for callback, kinds in self.subscribers:
+            if isinstance(event, kinds):
+                callback(event)
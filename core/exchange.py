@@ -0,0 +1,217 @@
+"""
+Expected declaration value of every possible exchange.
+
+A player discarding k cards draws k of the cards it has not seen, each set of
+k equally likely from where it sits. The expected point, sequences and sets
+after the draw are worked out exactly: sequences suit by suit, sets rank by
+rank and point from the joint distribution of suit lengths, all of which are
+hypergeometric and cached. The chance of scoring 30 or more in declarations,
+the first condition for repique, is estimated with NumPy from one set of
+sampled draws shared by every discard, and only for discards that could
+still beat the best found so far.
+"""
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from random import Random
+
+import numpy as np
+
+from core import vectorized
+from core.game import (Category, SCORE_VALUES, SUIT_SHIFTS, SET_RANKS, RANK_COLUMN, RANK_COUNTS,
+                       HOLDING_LENGTH, HOLDING_RUN, DECK_MASK)
+from core.tricks import cards
+
+POINT_VALUES = SCORE_VALUES[Category.POINT]
+SEQUENCE_VALUES = SCORE_VALUES[Category.SEQUENCES]
+SET_VALUES = SCORE_VALUES[Category.SETS]
+
+# The sequence score of each holding of a single suit.
+HOLDING_SEQUENCE_VALUE = tuple(SEQUENCE_VALUES.get(run, 0) for run in HOLDING_RUN)
+
+REPIQUE_SCORE = 30
+# What reaching 30 in declarations is counted as worth, allowing for the
+# opponent scoring something and spoiling the repique.
+REPIQUE_VALUE = 30
+
+
+@lru_cache(maxsize=None)
+def hypergeometric(population, successes, drawn):
+    """
+    The chance of drawing each number of successes.
+    """
+    total = comb(population, drawn)
+    return tuple(comb(successes, j) * comb(population - successes, drawn - j) / total
+                 for j in range(min(successes, drawn) + 1))
+
+
+@lru_cache(maxsize=None)
+def expected_point(profile, drawn):
+    """
+    The expected point score, given the kept length and the number of unseen
+    cards in each suit.
+    """
+    def ways_at_most(limit):
+        ways = [1]
+        for kept, unseen in profile:
+            if kept > limit:
+                return 0
+            factor = [comb(unseen, j) for j in range(min(limit - kept, unseen, drawn) + 1)]
+            product = [0] * min(len(ways) + len(factor) - 1, drawn + 1)
+            for i, a in enumerate(ways):
+                for j, b in enumerate(factor[:drawn + 1 - i]):
+                    product[i + j] += a * b
+            ways = product
+        return ways[drawn] if len(ways) > drawn else 0
+
+    total = comb(sum(unseen for _, unseen in profile), drawn)
+    expected = 0
+    previous = ways_at_most(3)
+    for length in range(4, 9):
+        current = ways_at_most(length)
+        expected += POINT_VALUES[length] * (current - previous)
+        previous = current
+    return expected / total
+
+
+@lru_cache(maxsize=None)
+def suit_sequence_values(kept, unseen):
+    """
+    The mean sequence score of a suit for each number of its unseen cards drawn.
+    """
+    totals = [0] * 9
+    counts = [0] * 9
+    subset = unseen
+    while True:
+        n = HOLDING_LENGTH[subset]
+        totals[n] += HOLDING_SEQUENCE_VALUE[kept | subset]
+        counts[n] += 1
+        if not subset:
+            break
+        subset = (subset - 1) & unseen
+    return tuple(total / count if count else 0 for total, count in zip(totals, counts))
+
+
+@lru_cache(maxsize=None)
+def expected_set(kept, unseen, population, drawn):
+    return sum(p * SET_VALUES.get(kept + j, 0)
+               for j, p in enumerate(hypergeometric(population, unseen, drawn)))
+
+
+def expected_values(kept, unseen, drawn):
+    """
+    The expected point, sequences and sets after drawing `drawn` unseen cards.
+    """
+    population = bin(unseen).count('1')
+    profile = []
+    sequences = 0
+    for shift in SUIT_SHIFTS.values():
+        kept_suit, unseen_suit = (kept >> shift) & 0xFF, (unseen >> shift) & 0xFF
+        profile.append((HOLDING_LENGTH[kept_suit], HOLDING_LENGTH[unseen_suit]))
+        means = suit_sequence_values(kept_suit, unseen_suit)
+        for j, p in enumerate(hypergeometric(population, HOLDING_LENGTH[unseen_suit], drawn)):
+            sequences += p * means[j]
+
+    sets = 0
+    for _, offset in SET_RANKS:
+        sets += expected_set(RANK_COUNTS[(kept >> offset) & RANK_COLUMN],
+                             RANK_COUNTS[(unseen >> offset) & RANK_COLUMN], population, drawn)
+
+    return {
+        Category.POINT: expected_point(tuple(profile), drawn),
+        Category.SEQUENCES: sequences,
+        Category.SETS: sets
+    }
+
+
+def sample_draws(unseen, samples, rng):
+    """
+    Shuffles of the unseen cards, as an array of card indices. Drawing k cards
+    takes the first k of each, so every discard is measured on the same draws.
+    """
+    pool = cards(unseen)
+    return np.array([rng.sample(pool, len(pool)) for _ in range(samples)], dtype=np.uint32)
+
+
+def draw_masks(orders, drawn):
+    return np.bitwise_or.reduce(np.left_shift(np.uint32(1), orders[:, :drawn]), axis=1) if drawn \
+        else np.zeros(len(orders), dtype=np.uint32)
+
+
+def repique_chances(kept, draws):
+    """
+    The share of draws that bring each kept hand to 30 or more in declarations.
+    """
+    hands = (np.asarray(kept, dtype=np.uint32)[:, None] | draws[None, :]).ravel()
+    totals = sum(vectorized.declare(hands, category)['value'].astype(np.int32)
+                 for category in Category.categories)
+    return (totals.reshape(len(kept), len(draws)) >= REPIQUE_SCORE).mean(axis=1)
+
+
+def evaluate_exchange(hand, discard, unseen=None, samples=256, rng=None):
+    """
+    The expected declaration values and repique chance of one discard.
+    """
+    unseen = DECK_MASK & ~hand if unseen is None else unseen
+    drawn = bin(discard).count('1')
+    kept = hand & ~discard
+    evaluation = expected_values(kept, unseen, drawn)
+    draws = draw_masks(sample_draws(unseen, samples, rng or Random()), drawn)
+    evaluation['repique'] = float(repique_chances([kept], draws)[0])
+    return evaluation
+
+
+def best_exchange(hand, unseen=None, max_cards=5, min_cards=0, keep=0, samples=256, screen=32,
+                  repique_value=REPIQUE_VALUE, rng=None):
+    """
+    Find the discard, as a mask, with the highest expected declaration score
+    plus `repique_value` times the repique chance. Cards in `keep` are never
+    discarded. Returns the discard and its evaluation.
+
+    Discards are pruned in three rounds. The best expected score is a floor for
+    the winner, and the repique chance is at most the expected score over 30
+    (Markov's inequality), so discards that cannot reach the floor are dropped
+    without sampling. The rest are screened on the first `screen` draws, and
+    only those whose optimistic estimate still reaches the best pessimistic
+    one are measured on all `samples`.
+    """
+    unseen = DECK_MASK & ~hand if unseen is None else unseen
+    hand_cards = cards(hand & ~keep)
+    max_cards = min(max_cards, bin(unseen).count('1'), len(hand_cards))
+    min_cards = min(min_cards, max_cards)
+
+    candidates = []
+    for drawn in range(min_cards, max_cards + 1):
+        for discarded in combinations(hand_cards, drawn):
+            discard = sum(1 << card for card in discarded)
+            evaluation = expected_values(hand & ~discard, unseen, drawn)
+            candidates.append((sum(evaluation.values()), discard, drawn, evaluation))
+    if not repique_value:
+        _, discard, _, evaluation = max(candidates, key=lambda candidate: candidate[0])
+        return discard, evaluation
+
+    floor = max(expected for expected, _, _, _ in candidates)
+    candidates = [candidate for candidate in candidates
+                  if candidate[0] + repique_value * min(1, candidate[0] / REPIQUE_SCORE) >= floor]
+
+    orders = sample_draws(unseen, samples, rng or Random())
+    for count in (min(screen, samples), samples):
+        chances = np.zeros(len(candidates))
+        for drawn in {candidate[2] for candidate in candidates}:
+            indices = [i for i, candidate in enumerate(candidates) if candidate[2] == drawn]
+            kept = [hand & ~candidates[i][1] for i in indices]
+            chances[indices] = repique_chances(kept, draw_masks(orders[:count], drawn))
+
+        margin = 2 * np.sqrt(chances * (1 - chances) / count) + 1 / count
+        expected = np.array([candidate[0] for candidate in candidates])
+        values = expected + repique_value * chances
+        if count == samples:
+            break
+        floor = (expected + repique_value * (chances - margin)).max()
+        candidates = [candidate for candidate, optimistic in zip(candidates, values + repique_value * margin)
+                      if optimistic >= floor]
+
+    best = int(values.argmax())
+    _, discard, _, evaluation = candidates[best]
+    evaluation['repique'] = float(chances[best])
+    return discard, evaluation
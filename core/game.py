@@ -1,5 +1,6 @@
+import random
 from enum import Enum
-from random import shuffle, choice
+from hashlib import sha256
 
 
 class Rank(Enum):
@@ -31,6 +32,45 @@ class Suit:
     CLUBS = '♧'
     suits = [DIAMONDS, HEARTS, SPADES, CLUBS]
 
+# Hands are also kept as 32-bit bitboards: one byte per suit, in the order of
+# Suit.suits, with bit 0 of each byte for the Seven and bit 7 for the Ace.
+SUIT_SHIFTS = {suit: 8 * i for i, suit in enumerate(Suit.suits)}
+SUIT_MASKS = {suit: 0xFF << shift for suit, shift in SUIT_SHIFTS.items()}
+
+# The ranks set in each of the 256 possible holdings of a single suit, lowest first.
+HOLDING_BITS = tuple(tuple(i for i in range(8) if holding >> i & 1) for holding in range(256))
+
+
+def longest_run(holding):
+    """
+    The length and top bit of the longest run in a holding. Of two runs of the
+    same length, the lower one is kept.
+    """
+    best_length, best_top = 0, 0
+    length = 0
+    for i in range(8):
+        length = length + 1 if holding >> i & 1 else 0
+        if length > best_length:
+            best_length, best_top = length, i
+    return best_length, best_top
+
+# Declaration lookup tables, indexed by the holding of a single suit.
+PIP_VALUES = [PIPS[rank] for rank in Rank]
+HOLDING_LENGTH = tuple(len(bits) for bits in HOLDING_BITS)
+HOLDING_PIPS = tuple(sum(PIP_VALUES[i] for i in bits) for bits in HOLDING_BITS)
+HOLDING_RUN, HOLDING_RUN_TOP = (tuple(column) for column in zip(*[longest_run(h) for h in range(256)]))
+
+# One bit per suit for the Seven; shifted by a rank offset it selects every card of that rank.
+RANK_COLUMN = sum(1 << shift for shift in SUIT_SHIFTS.values())
+# The number of cards of a rank, indexed by the masked column of that rank.
+RANK_COUNTS = {column: bin(column).count('1')
+               for column in (sum(1 << shift for i, shift in enumerate(SUIT_SHIFTS.values()) if n >> i & 1)
+                              for n in range(16))}
+
+# The ranks eligible for sets, highest first, with their bit offsets.
+SET_RANKS = [(rank, rank.value - Rank.Seven.value)
+             for rank in (Rank.Ace, Rank.King, Rank.Queen, Rank.Jack, Rank.Ten)]
+
 
 class Good:
     GOOD = 'good'
@@ -70,11 +110,66 @@ SCORE_VALUES = {
 }
 
 
-class Card:
+def get_strength(category, first):
+    candidate_scores = SCORE_VALUES[category].keys()
+    losing_scores = [score for score in candidate_scores if score < first]
+    return len(losing_scores) / (len(candidate_scores) - 1) if losing_scores else 0
+
+STRENGTHS = {category: {first: get_strength(category, first) for first in values}
+             for category, values in SCORE_VALUES.items()}
+
+
+CODES = {
+    Rank.Seven: '7',
+    Rank.Eight: '8',
+    Rank.Nine: '9',
+    Rank.Ten: 'T',
+    Rank.Jack: 'J',
+    Rank.Queen: 'Q',
+    Rank.King: 'K',
+    Rank.Ace: 'A',
+    Suit.DIAMONDS: 'D',
+    Suit.HEARTS: 'H',
+    Suit.SPADES: 'S',
+    Suit.CLUBS: 'C'
+}
+
 
-    def __init__(self, rank, suit):
-        self.rank = rank
-        self.suit = suit
+class Card:
+    """
+    There are only 32 cards, each created once; Card(rank, suit) returns the
+    existing one. Cards are immutable and carry their rank value, suit index,
+    bit position and code so that hot paths never have to compute them.
+    """
+    __slots__ = ('rank', 'suit', 'value', 'suit_index', 'index', 'bit', 'code', '_hash')
+    _deck = {}
+
+    def __new__(cls, rank, suit):
+        try:
+            return cls._deck[rank, suit]
+        except KeyError:
+            pass
+
+        card = super().__new__(cls)
+        index = SUIT_SHIFTS[suit] + rank.value - Rank.Seven.value
+        code = '{}{}'.format(CODES[rank], CODES[suit])
+        for name, value in (('rank', rank),
+                            ('suit', suit),
+                            ('value', rank.value),
+                            ('suit_index', Suit.suits.index(suit)),
+                            ('index', index),
+                            ('bit', 1 << index),
+                            ('code', code),
+                            ('_hash', hash(code))):
+            object.__setattr__(card, name, value)
+        cls._deck[rank, suit] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Cards are immutable.')
+
+    def __reduce__(self):
+        return Card, (self.rank, self.suit)
 
     def __str__(self):
         return "{}{}".format(self.rank.name, self.suit.capitalize())
@@ -83,45 +178,51 @@ class Card:
         return str(self)
 
     def __lt__(self, other):
-        return self.rank.value < other.rank.value
+        return self.value < other.value
 
     def __eq__(self, other):
-        return self.rank.value == other.rank.value
+        return self.value == other.value
 
     def __sub__(self, other):
-        return self.rank.value - other.rank.value
+        return self.value - other.value
 
     def hash(self):
-        CHARMAP = {
-            Rank.Seven: '7',
-            Rank.Eight: '8',
-            Rank.Nine: '9',
-            Rank.Ten: 'T',
-            Rank.Jack: 'J',
-            Rank.Queen: 'Q',
-            Rank.King: 'K',
-            Rank.Ace: 'A',
-            Suit.DIAMONDS: 'D',
-            Suit.HEARTS: 'H',
-            Suit.SPADES: 'S',
-            Suit.CLUBS: 'C'
-        }
-        return '{}{}'.format(CHARMAP[self.rank], CHARMAP[self.suit])
+        return self.code
 
     def __hash__(self):
-        return hash(self.hash())
+        return self._hash
+
+# The whole deck, indexed by bit position.
+DECK = tuple(Card(r, s) for s in Suit.suits for r in Rank)
+
+
+DECK_MASK = (1 << len(DECK)) - 1
 
 
 def all_cards():
-    return [Card(r, s) for s in Suit.suits for r in Rank]
+    return list(DECK)
+
+COURTS_MASK = sum(card.bit for card in DECK if card.rank in {Rank.Jack, Rank.Queen, Rank.King})
+
+
+def random_stream(seed, *path):
+    """
+    A random generator of its own for every path under a run's seed, such as
+    (seed, game) for a game's deals and (seed, game, 'player', 0) for one of
+    its players. Streams are independent of each other and of the order in
+    which they are made, so any one game can be played again by itself.
+    """
+    digest = sha256(repr((seed,) + path).encode()).digest()
+    return random.Random(int.from_bytes(digest, 'big'))
 
 
 class Deck:
 
-    def __init__(self, cards):
+    def __init__(self, cards, shuffled=True, rng=None):
         self.cards = []
         self.cards.extend(cards)
-        shuffle(self.cards)
+        if shuffled:
+            (rng or random).shuffle(self.cards)
 
     def __len__(self):
         return len(self.cards)
@@ -164,9 +265,9 @@ class Result:
         else:
             self.value = sum([SCORE_VALUES[category][len(cards)] for cards in self.second])
 
-        candidate_scores = SCORE_VALUES[category].keys()
-        losing_scores = [score for score in candidate_scores if score < self.first]
-        self.strength = len(losing_scores) / (len(candidate_scores) - 1) if losing_scores else 0
+        self.strength = STRENGTHS[category].get(first)
+        if self.strength is None:
+            self.strength = get_strength(category, first)
 
         self.point_suit = point_suit
 
@@ -243,22 +344,61 @@ class Result:
 
 
 class Player:
+    # Whether the server should announce events to this player.
+    listens = True
 
-    def __init__(self, name):
+    def __init__(self, name, rng=None):
         self.hand = {}
+        self.mask = 0
         self.name = name
+        self.rng = rng or random
         self.deal = None
+        self.declaration_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def __repr__(self):
         return '{}'.format(self.name)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Let go of anything kept between decisions, such as worker processes.
+        Servers call this when a partie is over.
+        """
+
     def reset(self):
         self.hand = {}
+        self.mask = 0
+        self.declaration_cache = {}
+
+    def draw(self, cards):
+        for card in cards:
+            self.hand[card.code] = card
+            self.mask |= card.bit
+        self.declaration_cache = {}
+
+    def discard(self, card):
+        del self.hand[card.code]
+        self.mask &= ~card.bit
+        self.declaration_cache = {}
+
+    def holding(self, suit):
+        """
+        The cards held in one suit, as an 8-bit mask of ranks.
+        """
+        return (self.mask & SUIT_MASKS[suit]) >> SUIT_SHIFTS[suit]
+
+    def has_suit(self, suit):
+        return bool(self.mask & SUIT_MASKS[suit])
 
     def suits(self):
-        return sorted([
-            sorted([c for c in self.hand.values() if c.suit == s], key=lambda x:x.rank.value)
-            for s in Suit.suits], key=len)
+        return sorted([self.get_suit(s) for s in Suit.suits], key=len)
 
     def print_hand(self, hand=None):
         def print_hash(card):
@@ -287,87 +427,93 @@ class Player:
         return suits
 
     def declare(self, category):
-        return getattr(self, category)
+        """
+        Declarations are worked out once per hand; any draw or discard
+        empties the cache.
+        """
+        try:
+            result = self.declaration_cache[category]
+        except KeyError:
+            self.cache_misses += 1
+            result = self.declaration_cache[category] = getattr(self, 'get_' + category)()
+        else:
+            self.cache_hits += 1
+        return result
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses}
 
     def get_suit(self, suit):
-        return sorted([card for card in self.hand.values() if card.suit == suit])
+        shift = SUIT_SHIFTS[suit]
+        return [DECK[shift + i] for i in HOLDING_BITS[(self.mask >> shift) & 0xFF]]
+
+    def get_rank(self, rank):
+        offset = rank.value - Rank.Seven.value
+        return [DECK[shift + offset] for shift in SUIT_SHIFTS.values()
+                if self.mask >> (shift + offset) & 1]
 
     @property
     def carte_blanche(self):
-        courts = {Rank.Jack, Rank.Queen, Rank.King}
-        return not [card for card in self.hand.values() if card.rank in courts]
+        return not self.mask & COURTS_MASK
 
     @property
     def point(self):
+        return self.declare(Category.POINT)
+
+    @property
+    def sequences(self):
+        return self.declare(Category.SEQUENCES)
+
+    @property
+    def sets(self):
+        return self.declare(Category.SETS)
+
+    def get_point(self):
         """
         A player may declare for point if they have 4 or more cards in one suit.
         Whoever has the longest point wins. If two players have the same value 
         for point, then the player with the highest value point wins.
         """
-        suits = self.suits()
-
-        max_length = len(suits[-1])
-
-        if max_length < 4:
+        mask = self.mask
+        point_length, max_points, point_shift = 0, 0, 0
+        for shift in SUIT_SHIFTS.values():
+            holding = (mask >> shift) & 0xFF
+            length, pips = HOLDING_LENGTH[holding], HOLDING_PIPS[holding]
+            if length > point_length or (length == point_length and pips > max_points):
+                point_length, max_points, point_shift = length, pips, shift
+
+        if point_length < 4:
             return Result(self, Category.POINT, 0, 0)
 
-        point_suits = [suit for suit in suits if len(suit) == max_length]
-
-        point_pips = [sum([PIPS[c.rank] for c in point_suit]) for point_suit in point_suits]
-        max_points = max(point_pips)
-        point_suit = point_suits[point_pips.index(max_points)]
-        point_length = len(point_suit)
-
+        point_suit = [DECK[point_shift + i] for i in HOLDING_BITS[(mask >> point_shift) & 0xFF]]
         return Result(self, Category.POINT, point_length, max_points, point_suit=point_suit)
 
-    @property
-    def sequences(self):
-        suits = self.suits()
+    def get_sequences(self):
+        mask = self.mask
         sequences = []
-        for suit in suits:
-            longest_sequence = []
-            suit.sort()
-            i = 0
-            runner = 1
-
-            while i < len(suit):
-                run = [suit[i]]
-                while runner < len(suit):
-                    card = suit[runner - 1]
-                    next_card = suit[runner]
-                    if next_card - card == 1:
-                        runner = runner + 1
-                        run.append(next_card)
-                    else:
-                        break
-
-                if len(run) > len(longest_sequence):
-                    longest_sequence = run
-
-                i = runner
-                runner = i + 1
-
-            sequences.append(longest_sequence)
-
-        sequences = sorted([sequence for sequence in sequences if len(sequence) >= 3],
-                           key=lambda l: (-len(l), -l[0].rank.value))
+        for shift in SUIT_SHIFTS.values():
+            holding = (mask >> shift) & 0xFF
+            run = HOLDING_RUN[holding]
+            if run >= 3:
+                top = HOLDING_RUN_TOP[holding]
+                cards = [DECK[shift + i] for i in range(top - run + 1, top + 1)]
+                # Ties go to the shorter suit, as they did when runs were read off self.suits().
+                sequences.append(((-run, -cards[0].value, HOLDING_LENGTH[holding]), cards))
+
+        sequences = [cards for _, cards in sorted(sequences, key=lambda s: s[0])]
         max_length = len(sequences[0]) if sequences else 0
         return Result(self, Category.SEQUENCES, max_length, sequences)
 
-    @property
-    def sets(self):
-        ELIGIBLE_RANKS = [
-            Rank.Ace,
-            Rank.King,
-            Rank.Queen,
-            Rank.Jack,
-            Rank.Ten
-        ]
-        sets = sorted([l for l in
-                       [[c for c in self.hand.values() if c.rank == r]
-                           for r in ELIGIBLE_RANKS]
-                       if len(l) >= 3],
-                      key=lambda l: (-len(l), -l[0].rank.value))
+    def get_sets(self):
+        mask = self.mask
+        sets = []
+        for rank, offset in SET_RANKS:
+            count = RANK_COUNTS[(mask >> offset) & RANK_COLUMN]
+            if count >= 3:
+                sets.append((-count, [DECK[shift + offset] for shift in SUIT_SHIFTS.values()
+                                      if mask >> (shift + offset) & 1]))
+        # SET_RANKS runs from the Ace down, so a stable sort on size alone keeps higher ranks first.
+        sets = [cards for _, cards in sorted(sets, key=lambda s: s[0])]
         set_class = len(sets[0]) if sets else 0
         return Result(self, Category.SETS, set_class, sets)
 
@@ -391,10 +537,13 @@ class Player:
 
 class Deal:
 
-    def __init__(self, partie, elder, younger):
+    def __init__(self, partie, elder, younger, deck=None, rng=None):
         self.partie = partie
         self.pool = all_cards()
-        self.deck = Deck(self.pool)
+        self.deck = deck or Deck(self.pool, rng=rng or partie.rng)
+        # The deck as it was before dealing, and each trick as (lead, follow), for records.
+        self.order = list(self.deck.cards)
+        self.plays = []
         self.elder = elder
         self.younger = younger
         self.players = {self.elder, self.younger}
@@ -403,6 +552,10 @@ class Deal:
         self.discards = {self.elder: [], self.younger: []}
         self.repique = None
         self.pique = None
+        # Who won each category of declarations, was carte blanche and was caput, if anyone.
+        self.declarations = {}
+        self.carte_blanche = None
+        self.caput = None
 
         elder.deal = self
         younger.deal = self
@@ -416,14 +569,15 @@ class Deal:
         for i in range(12):
             self.elder.draw([self.deck.pop()])
             self.younger.draw([self.deck.pop()])
-        for player in self.players:
+        for player in (self.elder, self.younger):
             if player.carte_blanche:
+                self.carte_blanche = player
                 self.score[player] += 10
                 break
 
     def exchange(self, player, cards):
         for card in cards:
-            del player.hand[card.hash()]
+            player.discard(card)
             self.discards[player].append(card)
             player.draw([self.deck.pop()])
 
@@ -431,8 +585,10 @@ class Deal:
         for category in (Category.POINT, Category.SEQUENCES, Category.SETS):
             declarations = [player.declare(category) for player in self.players]
             winning_score = max(declarations) if declarations[0] != declarations[1] else None
+            self.declarations[category] = None
             if winning_score:
                 winner = winning_score.player
+                self.declarations[category] = winner
                 self.score[winner] += winning_score.value
         # Repique
         for player in self.players:
@@ -447,14 +603,15 @@ class Deal:
         lead_player = lead_play['player']
         follow_player = follow_play['player']
 
-        del lead_player.hand[lead_card.hash()]
-        del follow_player.hand[follow_card.hash()]
+        lead_player.discard(lead_card)
+        follow_player.discard(follow_card)
+        self.plays.append((lead_card, follow_card))
 
         result = {'caput': None}
 
         self.score[lead_player] += 1
 
-        if follow_card.suit == lead_card.suit and follow_card.rank.value > lead_card.rank.value:
+        if follow_card.suit == lead_card.suit and follow_card.value > lead_card.value:
             self.score[follow_player] += 1
             winner = follow_player
             loser = lead_player
@@ -476,6 +633,7 @@ class Deal:
             if self.tricks[winner] == 12:  # If winner has taken all the tricks
                 self.score[winner] += 40
                 result['caput'] = winner
+                self.caput = winner
 
             elif self.tricks[winner] != 6:  # If winner (and thus both) have taken half the tricks
                 most_tricks_player = max(self.tricks.items(), key=lambda x: x[1])
@@ -483,21 +641,44 @@ class Deal:
 
             for player in self.players:
                 self.partie.score[player] += self.score[player]
+            self.partie.finish_deal(self)
 
         return result
 
 
+class DealSummary:
+    """
+    What a partie keeps of a finished deal: who was elder, the scores and
+    tricks, and who won what. It has the same attributes as the deal for
+    these, but none of its cards.
+    """
+    __slots__ = ('elder', 'younger', 'score', 'tricks', 'declarations', 'carte_blanche', 'repique', 'pique',
+                 'caput')
+
+    def __init__(self, deal):
+        for name in self.__slots__:
+            setattr(self, name, getattr(deal, name))
+
+    @property
+    def players(self):
+        return {self.elder, self.younger}
+
+
 class Partie:
 
-    def __init__(self, player1, player2):
+    def __init__(self, player1, player2, rng=None, keep_history=False):
         players = {player1, player2}
         self.players = players
-        self.dealer = choice(list(players))
+        self.seats = (player1, player2)
+        self.rng = rng or random
+        self.dealer = self.rng.choice(self.seats)
         self.non_dealer = (players - {self.dealer}).pop()
         self.deals = []
         self.score = {player1: 0, player2: 0}
         self.winner = None
         self.final_score = 0
+        # Whether to keep finished deals whole rather than as DealSummary.
+        self.keep_history = keep_history
 
     def new_deal(self):
         if not self.deals or len(self.deals) % 2 == 0:
@@ -507,8 +688,23 @@ class Partie:
         self.deals.append(d)
         return d
 
+    def finish_deal(self, deal):
+        """
+        Let go of a finished deal's cards, unless keeping the whole history,
+        and of the players' references to it.
+        """
+        for player in deal.players:
+            if player.deal is deal:
+                player.deal = None
+        if self.keep_history:
+            return
+        for i in range(len(self.deals) - 1, -1, -1):
+            if self.deals[i] is deal:
+                self.deals[i] = DealSummary(deal)
+                break
+
     def get_final_score(self):
-        self.winner = sorted(list(self.players), key=lambda x: self.score[x])[-1]
+        self.winner = sorted(self.seats, key=lambda x: self.score[x])[-1]
         self.loser = (self.players - {self.winner}).pop()
         if self.score[self.loser] >= 100:
             self.final_score = 100 + (self.score[self.winner] - self.score[self.loser])
@@ -0,0 +1,141 @@
+"""
+Timers, latency histograms and counters for servers.
+
+A server with no metrics records nothing. Give it a Metrics instance, or set
+Server.metrics for every server, to time the phases of each deal (wall and
+CPU clocks), the players' decisions, and to count games, deals, repiques,
+piques and capots. Read them back with snapshot() or, for scraping,
+prometheus().
+
+CPU time is the process's, so with several tables sharing a process it
+includes the other tables' work.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter, process_time
+
+# Upper bounds of the latency buckets, in seconds.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+COUNTERS = ('games', 'deals', 'repiques', 'piques', 'capots')
+
+
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        (upper bound, observations at or below it) for every bucket, ending
+        with infinity.
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum, 'buckets': self.cumulative()}
+
+
+class Metrics:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counters = {name: 0 for name in COUNTERS}
+        self.phases = {}
+        self.decisions = {}
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            timer = self.phases.setdefault(name, {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+            timer['count'] += 1
+            timer['wall'] += perf_counter() - wall
+            timer['cpu'] += process_time() - cpu
+
+    def observe(self, player, decision, seconds):
+        key = (str(player), decision)
+        histogram = self.decisions.get(key)
+        if histogram is None:
+            histogram = self.decisions[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def decide(self, player, decision, *args):
+        """
+        Call one of a player's decision methods and time it.
+        """
+        start = perf_counter()
+        try:
+            return getattr(player, decision)(*args)
+        finally:
+            self.observe(player, decision, perf_counter() - start)
+
+    def count_deal(self, deal):
+        self.count('deals')
+        if deal.repique:
+            self.count('repiques')
+        if deal.pique:
+            self.count('piques')
+        if 12 in deal.tricks.values():
+            self.count('capots')
+
+    def snapshot(self):
+        return {
+            'counters': dict(self.counters),
+            'phases': {name: dict(timer) for name, timer in self.phases.items()},
+            'decisions': {'{}.{}'.format(player, decision): histogram.snapshot()
+                          for (player, decision), histogram in self.decisions.items()}
+        }
+
+    def prometheus(self, prefix='pyquet'):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, value in self.counters.items():
+            metric = '{}_{}_total'.format(prefix, name)
+            lines += ['# TYPE {} counter'.format(metric), '{} {}'.format(metric, value)]
+
+        for kind in ('wall', 'cpu'):
+            metric = '{}_phase_{}_seconds_total'.format(prefix, kind)
+            lines.append('# TYPE {} counter'.format(metric))
+            for name, timer in self.phases.items():
+                lines.append('{}{} {}'.format(metric, labels(phase=name), timer[kind]))
+        metric = '{}_phases_total'.format(prefix)
+        lines.append('# TYPE {} counter'.format(metric))
+        for name, timer in self.phases.items():
+            lines.append('{}{} {}'.format(metric, labels(phase=name), timer['count']))
+
+        metric = '{}_decision_seconds'.format(prefix)
+        lines.append('# TYPE {} histogram'.format(metric))
+        for (player, decision), histogram in self.decisions.items():
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append('{}_bucket{} {}'.format(metric, labels(player=player, decision=decision, le=le), count))
+            lines.append('{}_sum{} {}'.format(metric, labels(player=player, decision=decision), histogram.sum))
+            lines.append('{}_count{} {}'.format(metric, labels(player=player, decision=decision), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    escaped = ('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for key, value in values.items())
+    return '{' + ','.join(escaped) + '}'
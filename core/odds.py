@@ -0,0 +1,116 @@
+"""
+Exact chances of the opponent's declarations beating ours.
+
+The opponent's hand is taken to be any `size` of the cards we have not seen,
+all equally likely. A declaration is the best of its parts (the point of each
+suit, the longest run in each suit, the set of each rank), so the opponent's
+is below ours exactly when every part is. Counting those hands suit by suit,
+or rank by rank, is a product of polynomials in the number of cards taken
+from each, whose coefficient for `size` cards is the count; no hand is ever
+enumerated.
+"""
+from functools import lru_cache
+from math import comb
+
+from core.game import (Category, SUIT_SHIFTS, SET_RANKS, RANK_COLUMN, RANK_COUNTS, HOLDING_LENGTH, HOLDING_PIPS,
+                       HOLDING_RUN, HOLDING_RUN_TOP, DECK_MASK)
+
+NOTHING = (0, 0)
+
+# What a holding of one suit declares, in an order that compares as
+# declarations do: point by length then pips, sequences by length then height.
+POINT_KEYS = tuple((HOLDING_LENGTH[h], HOLDING_PIPS[h]) if HOLDING_LENGTH[h] >= 4 else NOTHING for h in range(256))
+SEQUENCE_KEYS = tuple((HOLDING_RUN[h], HOLDING_RUN_TOP[h]) if HOLDING_RUN[h] >= 3 else NOTHING for h in range(256))
+SUIT_KEYS = {Category.POINT: POINT_KEYS, Category.SEQUENCES: SEQUENCE_KEYS}
+
+# The cards of the ranks below the Ten, which never make a set.
+FILLER_MASK = DECK_MASK & ~sum(RANK_COLUMN << offset for _, offset in SET_RANKS)
+
+OUTCOMES = ('better', 'equal', 'worse')
+
+
+def multiply(ways, factor, size):
+    product = [0] * min(len(ways) + len(factor) - 1, size + 1)
+    for i, a in enumerate(ways):
+        if a:
+            for j, b in enumerate(factor[:size + 1 - i]):
+                product[i + j] += a * b
+    return product
+
+
+@lru_cache(maxsize=None)
+def suit_ways(category, unseen, target):
+    """
+    For each number of cards taken from a suit's unseen holding, the number
+    of ways to take them with a declaration below `target` and the number
+    with one equal to it.
+    """
+    keys = SUIT_KEYS[category]
+    below, equal = [0] * 9, [0] * 9
+    subset = unseen
+    while True:
+        key = keys[subset]
+        if key < target:
+            below[HOLDING_LENGTH[subset]] += 1
+        elif key == target:
+            equal[HOLDING_LENGTH[subset]] += 1
+        if not subset:
+            break
+        subset = (subset - 1) & unseen
+    return tuple(below), tuple(equal)
+
+
+def rank_ways(unseen, rank, target):
+    below, equal = [0] * 5, [0] * 5
+    for taken in range(unseen + 1):
+        key = (taken, rank) if taken >= 3 else NOTHING
+        if key < target:
+            below[taken] = comb(unseen, taken)
+        elif key == target:
+            equal[taken] = comb(unseen, taken)
+    return below, equal
+
+
+def our_key(category, hand):
+    if category == Category.SETS:
+        return max(((RANK_COUNTS[hand >> offset & RANK_COLUMN], offset) for _, offset in SET_RANKS
+                    if RANK_COUNTS[hand >> offset & RANK_COLUMN] >= 3), default=NOTHING)
+    keys = SUIT_KEYS[category]
+    return max(keys[hand >> shift & 0xFF] for shift in SUIT_SHIFTS.values())
+
+
+def declaration_odds(category, hand, unseen, size=12):
+    """
+    The chances that an opponent holding `size` of the `unseen` cards has a
+    better, an equal or a worse declaration in `category` than `hand`.
+    """
+    return dict(zip(OUTCOMES, chances(category, hand, unseen, size)))
+
+
+@lru_cache(maxsize=4096)
+def chances(category, hand, unseen, size):
+    """
+    declaration_odds as a tuple in OUTCOMES order, cached. The tuple can be
+    shared by every caller; the dicts made from it are their own.
+    """
+    target = our_key(category, hand)
+    if category == Category.SETS:
+        groups = [rank_ways(RANK_COUNTS[unseen >> offset & RANK_COLUMN], offset, target) for _, offset in SET_RANKS]
+        filler = bin(unseen & FILLER_MASK).count('1')
+        free = [comb(filler, j) for j in range(filler + 1)]
+        groups.append((free, [0] * len(free)))
+    else:
+        groups = [suit_ways(category, unseen >> shift & 0xFF, target) for shift in SUIT_SHIFTS.values()]
+
+    below, at_most = [1], [1]
+    for group_below, group_equal in groups:
+        below = multiply(below, group_below, size)
+        at_most = multiply(at_most, [b + e for b, e in zip(group_below, group_equal)], size)
+    total = comb(bin(unseen).count('1'), size)
+    worse = below[size] / total if len(below) > size else 0.0
+    not_better = at_most[size] / total if len(at_most) > size else 0.0
+    return 1 - not_better, not_better - worse, worse
+
+
+def opponent_odds(hand, unseen, size=12):
+    return {category: declaration_odds(category, hand, unseen, size) for category in Category.categories}
@@ -1,5 +1,15 @@
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
 from core.game import Good, Rank, Player, Category, Deck, all_cards, Declaration, SCORE_VALUES, Card, Suit
-from random import choice
+from core.game import DECK, DECK_MASK, SUIT_MASKS, SUIT_SHIFTS, HOLDING_BITS, HOLDING_LENGTH
+from core.canonical import canonical_hand, restore
+from core.odds import opponent_odds
+from core.dataset import ELDER_EXCHANGE, YOUNGER_EXCHANGE, LEAD, FOLLOW
+from core.policy import Policy, features
+from core.search import search, merge_statistics, best_move
+from core.tricks import CardTracker, cards
+from random import Random
+from zlib import crc32
 
 
 class HumanPlayer(Player):
@@ -56,30 +66,31 @@ class HumanPlayer(Player):
     def get_follow(self, lead_card):
         card = self.get_cards('{}, play {}.'.format(self, lead_card.suit))[0]
 
-        if card.suit != lead_card.suit and self.get_suit(lead_card.suit):
+        if card.suit != lead_card.suit and self.has_suit(lead_card.suit):
             self.announce("You must play {}".format(lead_card.suit))
             return self.get_follow(lead_card)
 
         return card
 
-    def draw(self, cards):
-        for card in cards:
-            self.hand[card.hash()] = card
-
     def register(self, player, card, silent=False, lead=None):
         if not silent:
             self.announce('{} plays {}.'.format(player, card))
 
 
 class Rabelais(Player):
+    listens = False
+    # A DecisionCache of exchanges; see cached_exchange.
+    exchange_cache = None
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, exchange_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.exchange_cache = exchange_cache
         self.reset()
 
     def reset(self):
         super().reset()
         self.seen_cards = {}
+        self.tracker = CardTracker()
         self.opponent_is_out = {suit: False for suit in Suit.suits}
 
     def announce(self, message):
@@ -112,7 +123,7 @@ class Rabelais(Player):
                     if i == len(suit) - 1 or card - suit[i + 1] != 1:
                         break
             else:                        # Defensive ability
-                distance = 14 - suit[0].rank.value
+                distance = 14 - suit[0].value
                 if len(suit) - 1 >= distance:
                     for card in suit[:distance + 1]:
                         scored_cards[card] = scored_cards.get(card, 0) + .5
@@ -122,11 +133,54 @@ class Rabelais(Player):
         return {'cards': [weighted[1] for weighted in result],
                 'keepers': keepers}
 
+    def declaration_odds(self):
+        """
+        The chances of the opponent's declarations being better than, equal
+        to or worse than ours, by category, from the cards we haven't seen.
+        """
+        return opponent_odds(self.mask, DECK_MASK & ~self.tracker.seen, len(self.hand))
+
+    @classmethod
+    def exchange_strategy(cls):
+        """
+        A number for the class in cache keys, the same in every process.
+        """
+        return crc32('{}.{}'.format(cls.__module__, cls.__qualname__).encode()) & 0x7FFFFFF
+
+    def cached_exchange(self, max_cards, elder):
+        """
+        The exchange for this hand from the exchange cache, keyed by the
+        canonical hand and this player's class, so that players exchanging
+        differently can share a cache. Missing exchanges are worked out for
+        the canonical hand, so that every hand with the same canonical hand
+        exchanges the same way whatever the cache holds, by a copy of this
+        player dealt the canonical hand.
+        """
+        hand, permutation = canonical_hand(self.mask)
+        key = hand | max_cards << 32 | elder << 36 | self.exchange_strategy() << 37
+
+        def decide():
+            scratch = copy(self)
+            scratch.exchange_cache = None
+            scratch.reset()
+            scratch.draw([DECK[index] for index in cards(hand)])
+            if elder:
+                discards = scratch.get_elder_exchange()
+            else:
+                discards = scratch.get_younger_exchange(max_cards)
+            return sum(card.bit for card in discards)
+
+        return [DECK[index] for index in cards(restore(self.exchange_cache.lookup(key, decide), permutation))]
+
     def get_elder_exchange(self):
+        if self.exchange_cache is not None:
+            return self.cached_exchange(5, True)
         scored_cards = self.evaluate_hand()
         return scored_cards['cards'][:5]
 
     def get_younger_exchange(self, max_cards):
+        if self.exchange_cache is not None:
+            return self.cached_exchange(max_cards, False)
         evaluation = self.evaluate_hand()
         scored_cards = evaluation['cards']
         keepers = evaluation['keepers']
@@ -139,63 +193,158 @@ class Rabelais(Player):
         return scored_cards[:max_cards]
 
     def get_lead(self):
+        # Suits are considered shortest first, as Player.suits() orders them.
+        holdings = [(self.holding(suit), suit) for suit in Suit.suits]
+        holdings.sort(key=lambda item: HOLDING_LENGTH[item[0]])
+
+        # Lead the highest sure winner, from the suit with the most cards above
+        # the highest one outstanding.
+        best = None
+        for holding, suit in holdings:
+            winners = self.tracker.winners(holding, suit)
+            if winners:
+                candidate = (7 - self.tracker.highest_outstanding(suit), HOLDING_BITS[winners][-1], suit)
+                if not best or candidate[:2] > best[:2]:
+                    best = candidate
+        if best:
+            return DECK[SUIT_SHIFTS[best[2]] + best[1]]
+
+        # Otherwise the lowest card of the longest suit the opponent is out of.
         lead = None
-        safe_cards = {}
-        high_card = None
-        for suit_cards in self.suits():
-            if suit_cards:
-                counter = 0
-                safe_card = None
-                suit = suit_cards[0].suit
-                suit_cards.reverse()
-                for i, rank in enumerate(reversed([r for r in Rank])):
-                    candidate = Card(rank, suit)
-
-                    if not self.seen_cards.get(candidate.hash()):
-                        break
-
-                    counter += 1
-                    if (not safe_card or candidate > safe_card) and self.hand.get(candidate.hash()):
-                        safe_card = candidate
-
-                if safe_card:
-                    safe_cards[suit] = {'card': safe_card, 'run': counter}
-
-        if safe_cards:
-            high_card = max(safe_cards.values(), key=lambda d: (d['run'], d['card']))['card']
-        if high_card:
-            lead =  self.hand[high_card.hash()]
-        
-        elif True in self.opponent_is_out.values():
-            for suit_cards in self.suits():
-                if suit_cards:
-                    suit = suit_cards[0].suit
-                    if self.opponent_is_out[suit]:
-                        lead = suit_cards[0]
-        
+        for holding, suit in holdings:
+            if holding and self.opponent_is_out[suit]:
+                lead = DECK[SUIT_SHIFTS[suit] + HOLDING_BITS[holding][0]]
         if not lead:
-            lead = choice(list(self.hand.values()))
+            lead = self.rng.choice(list(self.hand.values()))
 
         return lead
 
     def get_follow(self, lead_card):
-        follow_suit = self.get_suit(lead_card.suit)
-        if follow_suit:
-            better_cards = [card for card in follow_suit if card.rank.value > lead_card.rank.value]
-            if better_cards:
-                return better_cards[0]
-            else:
-                return follow_suit[0]
+        holding = self.holding(lead_card.suit)
+        if holding:
+            # The lowest card that beats the lead, or else the lowest.
+            rank = lead_card.value - 7
+            better = holding >> (rank + 1) << (rank + 1)
+            return DECK[SUIT_SHIFTS[lead_card.suit] + HOLDING_BITS[better or holding][0]]
         else:
-            return sorted(self.hand.values())[0]
+            return min(self.hand.values())
 
     def draw(self, cards):
+        super().draw(cards)
         for card in cards:
-            self.hand[card.hash()] = card
-            self.seen_cards[card.hash()] = card
+            self.seen_cards[card.code] = card
+            self.tracker.see(card)
 
     def register(self, player, card, silent=True, lead=None):
         if player != self:
-            self.seen_cards[card.hash()] = card
+            self.seen_cards[card.code] = card
+            self.tracker.see(card)
             if lead and card.suit != lead.suit:
-                self.opponent_is_out[lead.suit] = True
\ No newline at end of file
+                self.opponent_is_out[lead.suit] = True
+
+class Montaigne(Rabelais):
+    """
+    Exchanges like Rabelais, but plays tricks by information-set Monte Carlo
+    tree search. The opponent's hand is dealt from the cards it has not seen,
+    keeping out of the suits the opponent is known to be out of.
+
+    Each move runs `iterations` playouts, stopping early if `time_budget`
+    seconds pass; one of the two must be given, and every search runs at
+    least one playout. With several `workers`, each process grows its own
+    tree and the root statistics are added together. Searches are seeded from
+    `rng`, or else from a generator seeded with `seed`.
+    """
+
+    def __init__(self, *args, iterations=400, time_budget=None, workers=1, seed=None, rng=None, **kwargs):
+        if iterations is None and not time_budget:
+            raise ValueError('Montaigne needs a number of iterations or a time budget.')
+        super().__init__(*args, rng=rng or Random(seed), **kwargs)
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.workers = workers
+        self.executor = None
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def information(self, lead_card=None):
+        deal = self.deal
+        opponent = deal.younger if deal.elder is self else deal.elder
+        size = len(self.hand)
+
+        return {
+            'hand': self.mask,
+            'unseen': DECK_MASK & ~self.tracker.seen,
+            'excluded': sum(SUIT_MASKS[suit] for suit, out in self.opponent_is_out.items() if out),
+            'opponent_size': size if lead_card is None else size - 1,
+            'leader': 0 if lead_card is None else 1,
+            'lead': None if lead_card is None else lead_card.index,
+            'score': (deal.score[self], deal.score[opponent]),
+            'tricks': (deal.tricks[self], deal.tricks[opponent]),
+            'pique': bool(deal.pique or deal.repique)
+        }
+
+    def choose(self, legal, lead_card=None):
+        if legal & (legal - 1) == 0:
+            return DECK[cards(legal)[0]]
+
+        info = self.information(lead_card)
+        if self.workers > 1:
+            if not self.executor:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            iterations = max(1, self.iterations // self.workers) if self.iterations is not None else None
+            futures = [self.executor.submit(search, info, iterations, self.time_budget, self.rng.random())
+                       for _ in range(self.workers)]
+            statistics = merge_statistics(future.result() for future in futures)
+        else:
+            statistics = search(info, self.iterations, self.time_budget, self.rng.random())
+
+        return DECK[best_move(statistics)]
+
+    def get_lead(self):
+        return self.choose(self.mask)
+
+    def get_follow(self, lead_card):
+        return self.choose(self.mask & SUIT_MASKS[lead_card.suit] or self.mask, lead_card)
+
+
+class Descartes(Rabelais):
+    """
+    Makes every decision with a learned policy (see core.policy), given as a
+    Policy or BatchedPolicy, or loaded from a `weights` file.
+
+    Tricks are played with the legal card the policy scores highest. In an
+    exchange the policy's scores are for keeping each card: the cards with
+    negative scores are discarded, lowest first, up to the number allowed.
+    """
+
+    def __init__(self, *args, policy=None, weights=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.policy = policy or Policy.load(weights)
+
+    def scores(self, decision, lead_card=None):
+        lead = -1 if lead_card is None else lead_card.index
+        return self.policy.evaluate(features([decision], [self.mask], [self.tracker.seen], [lead])[0])
+
+    def choose(self, legal, scores):
+        return DECK[max(cards(legal), key=lambda index: scores[index])]
+
+    def exchange(self, scores, max_cards):
+        if max_cards <= 0:
+            return []
+        held = sorted(cards(self.mask), key=lambda index: scores[index])
+        return [DECK[index] for index in held[:max_cards] if scores[index] < 0]
+
+    def get_elder_exchange(self):
+        return self.exchange(self.scores(ELDER_EXCHANGE), 5)
+
+    def get_younger_exchange(self, max_cards):
+        return self.exchange(self.scores(YOUNGER_EXCHANGE), max_cards)
+
+    def get_lead(self):
+        return self.choose(self.mask, self.scores(LEAD))
+
+    def get_follow(self, lead_card):
+        return self.choose(self.mask & SUIT_MASKS[lead_card.suit] or self.mask, self.scores(FOLLOW, lead_card))
@@ -0,0 +1,160 @@
+"""
+Learned policies for the computer players, evaluated with NumPy.
+
+A decision is encoded as FEATURES numbers: the bits of the hand, of the
+cards seen, of the card led (if any) and which decision it is, as in the
+records of core.dataset. A Policy is a small network of dense layers with
+ReLUs between them, mapping features to one score per card of the deck.
+
+Weights are .npz files holding `weights_0`, `biases_0`, `weights_1`, ...
+for each layer in turn; a single layer is a linear policy.
+
+A BatchedPolicy lets players at many tables in one process share a policy:
+each decision waits in a queue, and a worker thread evaluates whatever has
+queued up in one matrix multiply per layer.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue, Empty
+from threading import Thread
+
+import numpy as np
+
+from core.dataset import DECISIONS
+
+SHIFTS = np.arange(32, dtype=np.uint32)
+FEATURES = 3 * 32 + len(DECISIONS)
+
+
+def features(decision, hand, seen, lead):
+    """
+    The (N, FEATURES) encoding of N decisions, given as arrays of decision
+    numbers, hand and seen masks and lead card indices (-1 for none).
+    """
+    decision, lead = np.asarray(decision), np.asarray(lead)
+    hand, seen = np.asarray(hand, dtype=np.uint32), np.asarray(seen, dtype=np.uint32)
+    encoded = np.zeros((len(hand), FEATURES), dtype=np.float32)
+    encoded[:, 0:32] = (hand[:, None] >> SHIFTS) & 1
+    encoded[:, 32:64] = (seen[:, None] >> SHIFTS) & 1
+    rows = np.flatnonzero(lead >= 0)
+    encoded[rows, 64 + lead[rows]] = 1
+    encoded[np.arange(len(hand)), 96 + decision] = 1
+    return encoded
+
+
+def record_features(records):
+    return features(records['decision'], records['hand'], records['seen'], records['lead'])
+
+
+class Policy:
+
+    def __init__(self, layers):
+        self.layers = [(np.asarray(weights, dtype=np.float32), np.asarray(biases, dtype=np.float32))
+                       for weights, biases in layers]
+        if self.layers[0][0].shape[0] != FEATURES or self.layers[-1][0].shape[1] != 32:
+            raise ValueError('A policy takes {} features to 32 card scores.'.format(FEATURES))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as weights:
+            return cls([(weights['weights_{}'.format(i)], weights['biases_{}'.format(i)])
+                        for i in range(len(weights.files) // 2)])
+
+    @classmethod
+    def random(cls, hidden=(), rng=None):
+        """
+        A policy with small random weights and the given hidden layer sizes.
+        """
+        rng = rng or np.random.default_rng()
+        sizes = (FEATURES,) + tuple(hidden) + (32,)
+        return cls([(rng.normal(0, 1 / np.sqrt(n), (n, m)), np.zeros(m)) for n, m in zip(sizes, sizes[1:])])
+
+    def save(self, path):
+        np.savez(path, **{name.format(i): array for i, layer in enumerate(self.layers)
+                          for name, array in zip(('weights_{}', 'biases_{}'), layer)})
+
+    def forward(self, batch):
+        for i, (weights, biases) in enumerate(self.layers):
+            batch = batch @ weights + biases
+            if i < len(self.layers) - 1:
+                np.maximum(batch, 0, out=batch)
+        return batch
+
+    def evaluate(self, encoded):
+        return self.forward(encoded[None])[0]
+
+
+class BatchedPolicy:
+    """
+    A Policy shared by many threads. Each evaluate() call queues its
+    features and waits; the worker takes up to `max_batch` queued requests,
+    waiting up to `wait` seconds for more after the first, and evaluates
+    them together.
+    """
+
+    def __init__(self, policy, max_batch=256, wait=0.0005):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.wait = wait
+        self.queue = Queue()
+        self.batches = 0
+        self.evaluated = 0
+        self.thread = Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def evaluate(self, encoded):
+        future = Future()
+        self.queue.put((encoded, future))
+        return future.result()
+
+    def serve(self):
+        running = True
+        while running:
+            request = self.queue.get()
+            if request is None:
+                break
+            requests = [request]
+            while len(requests) < self.max_batch:
+                try:
+                    request = self.queue.get(timeout=self.wait)
+                except Empty:
+                    break
+                if request is None:
+                    running = False
+                    break
+                requests.append(request)
+
+            try:
+                scores = self.policy.forward(np.stack([encoded for encoded, _ in requests]))
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+            else:
+                for (_, future), row in zip(requests, scores):
+                    future.set_result(row)
+            self.batches += 1
+            self.evaluated += len(requests)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+def play_tables(entrants, parties, tables=64, seed=None):
+    """
+    Play `parties` headless parties between two entrants, `tables` at a time
+    on threads of this process, so that players sharing a BatchedPolicy have
+    their decisions evaluated together. Returns the combined tally.
+    """
+    from core.simulation import new_tally, merge_tallies, play_parties
+
+    tally = new_tally([name for _, name in entrants])
+    with ThreadPoolExecutor(max_workers=tables) as executor:
+        for result in executor.map(lambda game: play_parties(entrants, 1, seed=seed, first=game), range(parties)):
+            merge_tallies(tally, result)
+    return tally
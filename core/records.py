@@ -0,0 +1,169 @@
+"""
+Compact binary records of finished deals.
+
+Every record is RECORD_SIZE bytes:
+
+    1 byte    which of the two seats was elder
+    15 bytes  the deck order, as the rank of its permutation of the 32 cards
+    4 bytes   the elder's discards, as a mask
+    4 bytes   the younger's discards, as a mask
+    15 bytes  the 24 cards played, lead then follow for each trick, 5 bits each
+
+Everything else about a deal follows from these by replaying it. Files are
+plain runs of records, appended to as deals finish and memory-mapped to read.
+"""
+import mmap
+import struct
+from math import factorial
+
+from core.game import DECK, Deal, Deck, Partie
+
+DECK_BYTES = 15
+PLAY_BYTES = 15
+HEADER = struct.Struct('<B{}sII{}s'.format(DECK_BYTES, PLAY_BYTES))
+RECORD_SIZE = HEADER.size
+
+FACTORIALS = [factorial(n) for n in range(len(DECK) + 1)]
+
+
+def rank_permutation(order):
+    """
+    The lexicographic rank of a permutation of 0..n-1.
+    """
+    n = len(order)
+    rank = 0
+    remaining = list(range(n))
+    for i, value in enumerate(order):
+        position = remaining.index(value)
+        rank += position * FACTORIALS[n - 1 - i]
+        del remaining[position]
+    return rank
+
+
+def unrank_permutation(rank, n=len(DECK)):
+    remaining = list(range(n))
+    order = []
+    for i in range(n - 1, -1, -1):
+        position, rank = divmod(rank, FACTORIALS[i])
+        order.append(remaining.pop(position))
+    return order
+
+
+def pack_plays(plays):
+    packed = 0
+    for i, card in enumerate(plays):
+        packed |= card << (5 * i)
+    return packed.to_bytes(PLAY_BYTES, 'little')
+
+
+def unpack_plays(data, count=24):
+    packed = int.from_bytes(data, 'little')
+    return [(packed >> (5 * i)) & 0x1F for i in range(count)]
+
+
+def encode_deal(deal, seats):
+    """
+    Encode a finished deal. `seats` is the pair of players in a fixed order,
+    so that records of one partie can say who was elder in each deal.
+    """
+    if len(deal.plays) != 12:
+        raise ValueError('Only finished deals can be recorded.')
+    return HEADER.pack(
+        seats.index(deal.elder),
+        rank_permutation([card.index for card in deal.order]).to_bytes(DECK_BYTES, 'little'),
+        sum(card.bit for card in deal.discards[deal.elder]),
+        sum(card.bit for card in deal.discards[deal.younger]),
+        pack_plays([card.index for play in deal.plays for card in play]))
+
+
+def decode_deal(data):
+    elder, deck, elder_discards, younger_discards, plays = HEADER.unpack(data)
+    plays = unpack_plays(plays)
+    return {
+        'elder': elder,
+        'order': unrank_permutation(int.from_bytes(deck, 'little')),
+        'discards': (elder_discards, younger_discards),
+        'plays': list(zip(plays[0::2], plays[1::2]))
+    }
+
+
+class RecordWriter:
+
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, deal, seats):
+        self.file.write(encode_deal(deal, seats))
+
+    def close(self):
+        self.file.close()
+
+
+class RecordReader:
+    """
+    Random access to a file of records through a read-only memory map.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        size = self.file.seek(0, 2)
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.map) // RECORD_SIZE
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        start = (i % len(self)) * RECORD_SIZE
+        return decode_deal(self.map[start:start + RECORD_SIZE])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def close(self):
+        if self.map:
+            self.map.close()
+        self.file.close()
+
+
+def replay_deal(record, seats, partie=None):
+    """
+    Play a recorded deal again between the two seated players.
+    """
+    elder, younger = seats[record['elder']], seats[1 - record['elder']]
+    partie = partie or Partie(*seats)
+    deal = Deal(partie, elder, younger, deck=Deck([DECK[i] for i in record['order']], shuffled=False))
+    partie.deals.append(deal)
+
+    deal.deal()
+    for player, discards in zip((elder, younger), record['discards']):
+        deal.exchange(player, [card for card in DECK if card.bit & discards])
+    deal.score_declarations()
+
+    lead, follow = elder, younger
+    for lead_index, follow_index in record['plays']:
+        result = deal.play_trick({'player': lead, 'card': DECK[lead_index]},
+                                 {'player': follow, 'card': DECK[follow_index]})
+        if result['winner'] is not lead:
+            lead, follow = follow, lead
+    return deal
+
+
+def replay_partie(records, seats):
+    partie = Partie(*seats, keep_history=True)
+    for record in records:
+        replay_deal(record, seats, partie)
+    return partie
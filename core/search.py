@@ -0,0 +1,131 @@
+"""
+Information-set Monte Carlo tree search over the trick phase.
+
+The searching player is always player 0. Each iteration deals the opponent a
+hand consistent with what the searcher knows, then walks a single tree shared
+by all of those deals, only considering the moves that are legal in the
+current one (single-observer ISMCTS).
+"""
+from math import log, sqrt
+from random import Random
+from time import perf_counter
+
+from core.tricks import TrickState, cards
+
+# Trick-phase score differences are scaled down to keep rewards near [-1, 1].
+REWARD_SCALE = 60
+
+
+class Node:
+    __slots__ = ('player', 'children', 'visits', 'total', 'available')
+
+    def __init__(self, player):
+        self.player = player
+        self.children = {}
+        self.visits = 0
+        self.total = 0.0
+        self.available = 0
+
+
+def sample_hand(unseen, size, excluded, rng):
+    """
+    Deal `size` cards from the unseen ones, avoiding the excluded suits unless
+    that leaves too few cards.
+    """
+    pool = cards(unseen & ~excluded)
+    if len(pool) < size:
+        pool = cards(unseen)
+    return sum(1 << card for card in rng.sample(pool, size))
+
+
+def determinize(info, rng):
+    opponent = sample_hand(info['unseen'], info['opponent_size'], info['excluded'], rng)
+    return TrickState((info['hand'], opponent), info['leader'], info['score'], info['tricks'],
+                      info['pique'], info['lead'])
+
+
+def rollout(state, rng):
+    while not state.finished:
+        state.play(rng.choice(cards(state.moves())))
+
+
+def select(node, legal, exploration):
+    best, best_value = None, None
+    for move in legal:
+        child = node.children[move]
+        mean = child.total / child.visits
+        if child.player:
+            mean = -mean
+        value = mean + exploration * sqrt(log(child.available) / child.visits)
+        if best_value is None or value > best_value:
+            best, best_value = move, value
+    return best
+
+
+def search(info, iterations=None, time_budget=None, seed=None, exploration=0.7):
+    """
+    Search from an information set and return the visits and total reward of
+    each move at the root. Stops after `iterations`, or once `time_budget`
+    seconds have passed, whichever comes first, but never before one
+    playout.
+    """
+    if iterations is None and not time_budget:
+        raise ValueError('A search needs a number of iterations or a time budget.')
+    rng = Random(seed)
+    root = Node(None)
+    deadline = perf_counter() + time_budget if time_budget else None
+    start_diff = info['score'][0] - info['score'][1]
+    count = 0
+
+    while True:
+        count += 1
+        state = determinize(info, rng)
+        node = root
+        path = [root]
+
+        while not state.finished:
+            legal = cards(state.moves())
+            untried = []
+            for move in legal:
+                child = node.children.get(move)
+                if child is None:
+                    untried.append(move)
+                else:
+                    child.available += 1
+            if untried:
+                move = rng.choice(untried)
+                child = Node(state.to_move)
+                child.available = 1
+                node.children[move] = child
+                node = child
+                path.append(node)
+                state.play(move)
+                break
+            move = select(node, legal, exploration)
+            node = node.children[move]
+            path.append(node)
+            state.play(move)
+
+        rollout(state, rng)
+        reward = (state.score[0] - state.score[1] - start_diff) / REWARD_SCALE
+        for visited in path:
+            visited.visits += 1
+            visited.total += reward
+
+        if iterations is not None and count >= iterations or deadline is not None and perf_counter() >= deadline:
+            break
+
+    return {move: (child.visits, child.total) for move, child in root.children.items()}
+
+
+def merge_statistics(results):
+    merged = {}
+    for statistics in results:
+        for move, (visits, total) in statistics.items():
+            old_visits, old_total = merged.get(move, (0, 0.0))
+            merged[move] = (old_visits + visits, old_total + total)
+    return merged
+
+
+def best_move(statistics):
+    return max(statistics.items(), key=lambda item: (item[1][0], item[1][1]))[0]
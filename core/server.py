@@ -1,8 +1,16 @@
+from contextlib import nullcontext
+
+from core.events import (CarteBlanche, Exchanged, NotGood, Declared, Answered, DeclarationWon, Repique, Pique,
+                         Caput, CardPlayed, TrickWon, PlayerScore, DealScore, PartieScore, PartieWon)
 from core.game import Good, Declaration, Partie, Category
 from core.players import Rabelais, HumanPlayer
 
 
 class Server:
+    # A core.metrics.Metrics to record timings and counts in, if any.
+    metrics = None
+    # A core.events.EventBus to publish events to, if any.
+    events = None
 
     def get_player(self, player_num):
         return HumanPlayer(input("Player {}, please enter your name: ".format(player_num)))
@@ -15,29 +23,44 @@ class Server:
 
     def announce(self, message):
         for player in self.players:
-            player.announce(message)
+            if player.listens:
+                player.announce(message)
+        if self.events:
+            self.events.publish(message)
 
-    def register(self, *args, **kwargs):
+    def register(self, player, card, **kwargs):
         for recipient in self.players:
-            recipient.register(*args, **kwargs)
+            recipient.register(player, card, **kwargs)
+        if self.events:
+            self.events.publish(CardPlayed(player, card, kwargs.get('lead')))
+
+    def ask(self, player, decision, *args):
+        if self.metrics is None:
+            return getattr(player, decision)(*args)
+        return self.metrics.decide(player, decision, *args)
+
+    def phase(self, name):
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.phase(name)
 
     def exchange(self, deal):
         elder, younger = deal.elder, deal.younger
 
         if elder.carte_blanche:
-            self.announce('{} is carte blanche.'.format(elder))
+            self.announce(CarteBlanche(elder))
 
-        elder_exchange = elder.get_elder_exchange()
-        self.announce('{} exchanges {} cards.'.format(elder, len(elder_exchange)))
+        elder_exchange = self.ask(elder, 'get_elder_exchange')
+        self.announce(Exchanged(elder, len(elder_exchange)))
         deal.exchange(elder, elder_exchange)
 
         remainder = len(deal.deck)
 
         if younger.carte_blanche:
-            self.announce('{} is carte_blanche.'.format(younger))
+            self.announce(CarteBlanche(younger))
 
-        younger_exchange = younger.get_younger_exchange(remainder)
-        self.announce('{} exchanges {} cards.'.format(younger, len(younger_exchange)))
+        younger_exchange = self.ask(younger, 'get_younger_exchange', remainder)
+        self.announce(Exchanged(younger, len(younger_exchange)))
         deal.exchange(younger, younger_exchange)
 
     def declarations(self, deal):
@@ -53,21 +76,21 @@ class Server:
 
             if not elder_declaration.first:
                 good = Good.NOT_GOOD
-                self.announce('{} is not good in {}.'.format(elder, category))
+                self.announce(NotGood(elder, category))
 
             else:
-                good = younger.get_good(elder_declaration)
+                good = self.ask(younger, 'get_good', elder_declaration)
 
-                self.announce('{} has {}.'.format(elder, elder_declaration))
-                self.announce("That's {}.".format(good))
+                self.announce(Declared(elder, elder_declaration))
+                self.announce(Answered(good))
 
                 if good == Good.EQUAL:
                     detail = True
                     elder_declaration = Declaration(elder.declare(category), detail)
-                    good = younger.get_good(elder_declaration)
+                    good = self.ask(younger, 'get_good', elder_declaration)
 
-                    self.announce('{} has {}.'.format(elder, elder_declaration))
-                    self.announce("That's {}.".format(good))
+                    self.announce(Declared(elder, elder_declaration))
+                    self.announce(Answered(good))
 
             if good == Good.GOOD:
                 winners[category]['winner'] = elder_declaration
@@ -80,14 +103,12 @@ class Server:
             result = winners[category]
             winning_declaration = result.get('winner')
             if winning_declaration and winning_declaration.first:
-                self.announce("{winner} wins {category} with {score}.".format(winner=winning_declaration.result.player,
-                                                                              category=category,
-                                                                              score=winning_declaration.all_results))
+                self.announce(DeclarationWon(winning_declaration.result.player, category, winning_declaration))
 
         deal.score_declarations()
         if deal.repique:
-            self.announce('{} is repique.'.format(deal.repique))
-        self.announce(deal.score)
+            self.announce(Repique(deal.repique))
+        self.announce(DealScore(deal.score))
 
     def tricks(self, deal):
         lead = deal.elder
@@ -96,9 +117,9 @@ class Server:
         while lead.hand:
             follow = (deal.players - {lead}).pop()
 
-            lead_card = lead.get_lead()
+            lead_card = self.ask(lead, 'get_lead')
             self.register(lead, lead_card)
-            follow_card = follow.get_follow(lead_card)
+            follow_card = self.ask(follow, 'get_follow', lead_card)
             self.register(follow, follow_card, lead=lead_card)
 
             lead_play = {'player': lead, 'card': lead_card}
@@ -106,38 +127,49 @@ class Server:
 
             result = deal.play_trick(lead_play, follow_play)
             lead = result['winner']
-            self.announce('{} takes the trick.'.format(lead))
+            self.announce(TrickWon(lead))
 
             if not announced_pique and deal.pique:
-                self.announce("{} is pique.".format(deal.pique))
+                self.announce(Pique(deal.pique))
                 announced_pique = True
 
-            self.announce('{}: {}'.format(lead, deal.score[lead]))
+            self.announce(PlayerScore(lead, deal.score[lead]))
 
         if result['caput']:
-            self.announce('{} is caput.'.format(result['caput']))
+            self.announce(Caput(result['caput']))
 
     def play_a_hand(self):
         d = self.partie.new_deal()
         # The deal
         self.announce('---')
-        d.deal()
-        self.exchange(d)
-        self.declarations(d)
-        self.tricks(d)
+        with self.phase('deal'):
+            d.deal()
+        with self.phase('exchange'):
+            self.exchange(d)
+        with self.phase('declarations'):
+            self.declarations(d)
+        with self.phase('tricks'):
+            self.tricks(d)
+        if self.metrics is not None:
+            self.metrics.count_deal(d)
         return d.score
 
+    def close_players(self):
+        for player in self.partie.seats:
+            player.close()
+
     def play_a_game(self):
-        while len(self.partie.deals) < 6:
-            self.play_a_hand()
-            self.announce("After {} deal(s), the score is {}".format(len(self.partie.deals), self.partie.score))
+        try:
+            while len(self.partie.deals) < 6:
+                self.play_a_hand()
+                self.announce(PartieScore(len(self.partie.deals), self.partie.score))
+        finally:
+            self.close_players()
 
         final_score = self.partie.get_final_score()
+        if self.metrics is not None:
+            self.metrics.count('games')
 
         winner = self.partie.winner
         loser = self.partie.loser
-
-        if self.partie.score[loser] >= 100:
-            self.announce('{} crossed the rubicon and {} won with {}.'.format(loser, winner, final_score))
-        else:
-            self.announce('{} failed to cross the rubicon and {} won with {}.'.format(loser, winner, final_score))
+        self.announce(PartieWon(winner, loser, final_score, self.partie.score[loser] >= 100))
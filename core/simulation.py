@@ -0,0 +1,251 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+from core.game import Partie, random_stream
+from core.server import Server
+from core.players import Rabelais
+from core.records import RecordWriter
+from core.dataset import ShardWriter
+from core.cache import DecisionCache, write_table
+from core.stats import Statistics
+
+
+class HeadlessServer(Server):
+    """
+    Plays a partie between two computer players without announcing anything
+    or formatting any of the messages the interactive server would print.
+    """
+
+    def __init__(self, player1, player2, recorder=None, rng=None):
+        self.players = {player1, player2}
+        self.seats = (player1, player2)
+        self.partie = Partie(player1, player2, rng=rng)
+        self.recorder = recorder
+
+    def announce(self, message):
+        pass
+
+    def exchange(self, deal):
+        deal.exchange(deal.elder, deal.elder.get_elder_exchange())
+        deal.exchange(deal.younger, deal.younger.get_younger_exchange(len(deal.deck)))
+
+    def declarations(self, deal):
+        deal.score_declarations()
+
+    def tricks(self, deal):
+        lead = deal.elder
+        follow = deal.younger
+        while lead.hand:
+            lead_card = lead.get_lead()
+            self.register(lead, lead_card, silent=True)
+            follow_card = follow.get_follow(lead_card)
+            self.register(follow, follow_card, silent=True, lead=lead_card)
+
+            result = deal.play_trick({'player': lead, 'card': lead_card},
+                                     {'player': follow, 'card': follow_card})
+            if result['winner'] is not lead:
+                lead, follow = follow, lead
+
+    def play_a_hand(self):
+        d = self.partie.new_deal()
+        d.deal()
+        self.exchange(d)
+        self.declarations(d)
+        self.tricks(d)
+        if self.recorder:
+            self.recorder.write(d, self.seats)
+        return d.score
+
+    def play_a_game(self):
+        try:
+            while len(self.partie.deals) < 6:
+                self.play_a_hand()
+        finally:
+            self.close_players()
+        return self.partie.get_final_score()
+
+
+def new_tally(names):
+    return {
+        'parties': 0,
+        'deals': 0,
+        'rubicons': 0,
+        'wins': {name: 0 for name in names},
+        'score': {name: 0 for name in names},
+        'final_score': {name: 0 for name in names},
+        'statistics': Statistics()
+    }
+
+
+def merge_tallies(tally, other):
+    for key in ('parties', 'deals', 'rubicons'):
+        tally[key] += other[key]
+    for key in ('wins', 'score', 'final_score'):
+        for name, value in other[key].items():
+            tally[key][name] = tally[key].get(name, 0) + value
+    tally['statistics'].merge(other['statistics'])
+    if 'exchanges' in other:
+        tally.setdefault('exchanges', {}).update(other['exchanges'])
+    return tally
+
+
+def new_server(entrants, seed=None, game=0, recorder=None, exchange_cache=None):
+    """
+    A headless server between two entrants. With a run seed, the partie and
+    each player draw from their own streams for this game, so that the game
+    plays out the same whenever it is played. Rabelais players are given the
+    `exchange_cache` if there is one.
+    """
+    players = []
+    for i, (cls, name) in enumerate(entrants):
+        kwargs = {}
+        if seed is not None:
+            kwargs['rng'] = random_stream(seed, game, 'player', i)
+        if exchange_cache is not None and issubclass(cls, Rabelais):
+            kwargs['exchange_cache'] = exchange_cache
+        players.append(cls(name, **kwargs))
+    return HeadlessServer(*players, recorder=recorder, rng=None if seed is None else random_stream(seed, game))
+
+
+class Recorders(list):
+    """
+    Several recorders taking the same deals.
+    """
+
+    def write(self, deal, seats):
+        for recorder in self:
+            recorder.write(deal, seats)
+
+    def close(self):
+        for recorder in self:
+            recorder.close()
+
+
+def play_parties(entrants, parties, record=None, seed=None, first=0, dataset=None, prefix='shard',
+                 exchange_cache=None):
+    """
+    Play a number of parties between two entrants, each a (player class, name)
+    pair, and tally the results by player name. Deals are appended to the
+    `record` file if one is given, with the entrants seated in order, and
+    their decisions written to shards named `prefix` in the `dataset`
+    directory. With a `seed`, the parties are games `first` onwards of that
+    run.
+
+    With an `exchange_cache` table, Rabelais players take their exchanges
+    from it, and the exchanges it was missing are returned in the tally.
+    """
+    tally = new_tally([name for _, name in entrants])
+    cache = DecisionCache(exchange_cache) if exchange_cache else None
+    recorder = Recorders(([RecordWriter(record)] if record else []) +
+                         ([ShardWriter(dataset, prefix=prefix)] if dataset else [])) or None
+    for game in range(first, first + parties):
+        server = new_server(entrants, seed, game, recorder, cache)
+        final_score = server.play_a_game()
+        partie = server.partie
+
+        tally['parties'] += 1
+        tally['deals'] += len(partie.deals)
+        tally['wins'][partie.winner.name] += 1
+        tally['final_score'][partie.winner.name] += final_score
+        for player in partie.players:
+            tally['score'][player.name] += partie.score[player]
+        if partie.score[partie.loser] < 100:
+            tally['rubicons'] += 1
+        for deal in partie.deals:
+            tally['statistics'].add_deal(deal)
+        tally['statistics'].add_partie(partie)
+    if recorder:
+        recorder.close()
+    if cache:
+        tally['exchanges'] = cache.pending
+    return tally
+
+
+def chunk_sizes(parties, chunks):
+    chunks = max(1, min(chunks, parties))
+    size, extra = divmod(parties, chunks)
+    return [size + 1 if i < extra else size for i in range(chunks)]
+
+
+def simulate(entrants, parties, workers=None, chunks_per_worker=4, record=None, seed=None, dataset=None,
+             exchange_cache=None):
+    """
+    Play `parties` headless parties between two entrants across a pool of
+    worker processes and return the combined tally. With a single worker the
+    parties are played in this process.
+
+    With `record`, deals are recorded to that file, or with several workers
+    to one file per chunk, named `record` followed by the chunk number.
+    With `dataset`, the decisions are written to shards in that directory,
+    prefixed by the chunk number. With `exchange_cache`, Rabelais players
+    take their exchanges from that table, which is brought up to date with
+    the exchanges it was missing at the end of the run.
+
+    With a `seed`, the run is reproducible whatever the number of workers,
+    and replay_game can play any one of its games again.
+    """
+    if len({name for _, name in entrants}) != 2:
+        raise ValueError('Simulations need two entrants with different names.')
+
+    workers = workers or cpu_count() or 1
+    if workers == 1:
+        tally = play_parties(entrants, parties, record, seed, dataset=dataset, exchange_cache=exchange_cache)
+    else:
+        tally = new_tally([name for _, name in entrants])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            first = 0
+            for i, size in enumerate(chunk_sizes(parties, workers * chunks_per_worker)):
+                futures.append(executor.submit(play_parties, entrants, size,
+                                               '{}.{}'.format(record, i) if record else None, seed, first,
+                                               dataset, 'shard-{}'.format(i), exchange_cache))
+                first += size
+            for future in futures:
+                merge_tallies(tally, future.result())
+
+    if exchange_cache:
+        write_table(exchange_cache, tally.pop('exchanges'))
+    return tally
+
+
+def replay_game(entrants, seed, game):
+    """
+    Play game number `game` of a seeded run again, and return its server.
+    Its partie keeps every deal whole.
+    """
+    server = new_server(entrants, seed, game)
+    server.partie.keep_history = True
+    server.play_a_game()
+    return server
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Play headless parties between two Rabelais players.')
+    parser.add_argument('parties', type=int, nargs='?', default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--record', default=None, help='file to record the deals to')
+    parser.add_argument('--dataset', default=None, help='directory to write decision shards to')
+    parser.add_argument('--exchange-cache', default=None, help='table of exchanges to use and update')
+    parser.add_argument('--seed', type=int, default=None, help='seed for a reproducible run')
+    parser.add_argument('--replay', type=int, default=None, metavar='GAME',
+                        help='play one game of the seeded run again and show its deals')
+    args = parser.parse_args()
+
+    entrants = [(Rabelais, 'Barry Lyndon'), (Rabelais, 'Rabelais')]
+    if args.replay is not None:
+        partie = replay_game(entrants, args.seed, args.replay).partie
+        for i, deal in enumerate(partie.deals):
+            print('Deal {}: {}, elder {}'.format(i + 1, deal.score, deal.elder))
+        print('Winner: {} with {}'.format(partie.winner, partie.final_score))
+    else:
+        from pprint import pprint
+
+        tally = simulate(entrants, args.parties, workers=args.workers, record=args.record, seed=args.seed,
+                         dataset=args.dataset, exchange_cache=args.exchange_cache)
+        statistics = tally.pop('statistics').summary()
+        for key in ('deal_histograms', 'final_histogram'):
+            del statistics[key]
+        pprint(tally)
+        pprint(statistics)
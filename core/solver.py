@@ -0,0 +1,281 @@
+"""
+A double-dummy solver for the trick phase: both hands are known, and both
+players play to maximise their own score less the other's, scored as
+Deal.play_trick scores it.
+
+The search is alpha-beta over whole tricks, with cards that touch (no card
+left in play between them) merged into one move, cheap winners and high
+leads tried first, and a fixed-size transposition table keyed by Zobrist
+hashes of who holds which card. A canonical solver keys the table by the
+hands up to relabelling the suits instead, so that positions which are
+twins of each other, within a deal or across deals, share their entries.
+"""
+from random import Random
+
+from core.canonical import canonical_pair, permute_card, restore_card
+from core.game import DECK
+from core.tricks import SUIT_OF, cards, follows, beats
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+_zobrist = Random(20150101)
+# One key per card and holder, one for player 1 being on lead, one per
+# number of tricks taken by player 0 and one per number of tricks played.
+CARD_KEYS = tuple((_zobrist.getrandbits(64), _zobrist.getrandbits(64)) for _ in DECK)
+LEADER_KEY = _zobrist.getrandbits(64)
+TRICK_KEYS = tuple(_zobrist.getrandbits(64) for _ in range(13))
+PLAYED_KEYS = tuple(_zobrist.getrandbits(64) for _ in range(13))
+
+
+def hand_key(hands):
+    key = 0
+    for player, hand in enumerate(hands):
+        for card in cards(hand):
+            key ^= CARD_KEYS[card][player]
+    return key
+
+
+def representatives(mine, theirs):
+    """
+    One card from each group of touching cards in `mine`: cards of one suit
+    with nothing from `theirs` between them are interchangeable.
+    """
+    combined = mine | theirs
+    chosen = 0
+    for card in cards(mine):
+        below = combined & SUIT_OF[card] & ((1 << card) - 1)
+        if not below or not mine >> (below.bit_length() - 1) & 1:
+            chosen |= 1 << card
+    return chosen
+
+
+def play_trick(hands, leader, score, won, played, pique, lead, follow):
+    """
+    Play one trick of a position, scored as Deal.play_trick scores it, and
+    return the position after it.
+    """
+    h0, h1 = hands
+    s0, s1 = score
+    if leader:
+        h1 &= ~(1 << lead)
+        h0 &= ~(1 << follow)
+        s1 += 1
+    else:
+        h0 &= ~(1 << lead)
+        h1 &= ~(1 << follow)
+        s0 += 1
+
+    winner = 1 - leader if beats(follow, lead) else leader
+    if winner:
+        if winner != leader:
+            s1 += 1
+    else:
+        if winner != leader:
+            s0 += 1
+        won += 1
+    played += 1
+
+    if not pique:
+        if winner and s1 >= 30 and s0 == 0:
+            s1 += 30
+            pique = True
+        elif not winner and s0 >= 30 and s1 == 0:
+            s0 += 30
+            pique = True
+
+    if not h0 and not h1:
+        tricks = (won, played - won)
+        bonus = 1
+        if tricks[winner] == 12:
+            bonus += 40
+        if winner:
+            s1 += bonus
+        else:
+            s0 += bonus
+        if tricks[winner] != 12 and tricks[winner] != 6:
+            if tricks[0] > tricks[1]:
+                s0 += 10
+            else:
+                s1 += 10
+
+    return (h0, h1), winner, (s0, s1), won, played, pique
+
+
+def lead_order(lead, opponent):
+    """
+    Sure winners first, then higher ranks.
+    """
+    return (bool(opponent & SUIT_OF[lead] & ~((2 << lead) - 1)), -(lead & 7))
+
+
+class Solver:
+    """
+    Holds the transposition table, which is 2 ** `table_bits` entries and is
+    kept between calls to solve(). With `canonical`, entries are keyed by the
+    canonical pair of hands, and their best leads kept in canonical suits.
+    """
+
+    def __init__(self, table_bits=20, canonical=False):
+        self.mask = (1 << table_bits) - 1
+        self.table = [None] * (1 << table_bits)
+        self.canonical = canonical
+        self.nodes = 0
+
+    def clear(self):
+        self.table = [None] * len(self.table)
+
+    def solve(self, hands, leader, score=(0, 0), tricks=(0, 0), pique=False):
+        """
+        Solve a position between tricks. `score` holds everything already
+        scored in the deal, `tricks` the tricks each player has taken and
+        `pique` whether pique or repique already happened. The most tricks
+        and caput are counted on `tricks` and the tricks still to play, so a
+        short position left at the default `tricks` is scored as a deal of
+        its own length.
+
+        Returns the best score difference (player 0 less player 1) still to
+        come, the final score and tricks along a principal variation, and the
+        tricks played on it.
+        """
+        hands, score = tuple(hands), tuple(score)
+        won, played = tricks[0], tricks[0] + tricks[1]
+        value = self.search(hands, leader, score, won, played, pique, hand_key(hands), -10 ** 6, 10 ** 6)
+
+        play = []
+        target = value
+        while hands[0] or hands[1]:
+            key = hand_key(hands)
+            for lead, follow in self.trick_moves(hands, leader):
+                position = play_trick(hands, leader, score, won, played, pique, lead, follow)
+                child_key = key ^ CARD_KEYS[lead][leader] ^ CARD_KEYS[follow][1 - leader]
+                new_hands, new_leader, new_score, new_won, _, new_pique = position
+                delta = (new_score[0] - new_score[1]) - (score[0] - score[1])
+                # A window just around the target is enough to tell if this trick keeps to it.
+                rest = self.search(new_hands, new_leader, new_score, new_won, played + 1, new_pique, child_key,
+                                   target - delta - 1, target - delta + 1)
+                if delta + rest == target:
+                    play.append((DECK[lead], DECK[follow], new_leader))
+                    hands, leader, score, won, played, pique = position
+                    target = rest
+                    break
+            else:
+                raise RuntimeError('No trick keeps to the solved value of this position.')
+
+        return {
+            'value': value,
+            'score': score,
+            'tricks': (won, played - won),
+            'play': play
+        }
+
+    def trick_moves(self, hands, leader):
+        for lead in cards(representatives(hands[leader], hands[1 - leader])):
+            legal = follows(hands[1 - leader], lead)
+            for follow in cards(representatives(legal, hands[leader]) & legal):
+                yield lead, follow
+
+    def search(self, hands, leader, score, won, played, pique, key, alpha, beta):
+        follower = 1 - leader
+        leader_hand, follower_hand = hands[leader], hands[follower]
+        if not leader_hand:
+            return 0
+        self.nodes += 1
+
+        if self.canonical:
+            pair, permutation = canonical_pair(*hands)
+            key = hash(pair)
+
+        # Pique depends on the scores only while one of them is still nothing.
+        full_key = key ^ TRICK_KEYS[won] ^ PLAYED_KEYS[played] ^ (LEADER_KEY if leader else 0)
+        if not pique and (score[0] == 0 or score[1] == 0):
+            full_key ^= hash(score)
+        index = full_key & self.mask
+        entry = self.table[index]
+        original_alpha, original_beta = alpha, beta
+        best_lead = None
+        if entry and entry[0] == full_key:
+            _, flag, stored, best_lead = entry
+            if self.canonical and best_lead is not None:
+                best_lead = restore_card(best_lead, permutation)
+            if flag == EXACT:
+                return stored
+            if flag == LOWER:
+                alpha = max(alpha, stored)
+            else:
+                beta = min(beta, stored)
+            if alpha >= beta:
+                return stored
+
+        maximising = leader == 0
+        base = score[0] - score[1]
+        leads = cards(representatives(leader_hand, follower_hand))
+        leads.sort(key=lambda lead: lead_order(lead, follower_hand))
+        if best_lead in leads:
+            leads.remove(best_lead)
+            leads.insert(0, best_lead)
+
+        best, chosen = None, None
+        for lead in leads:
+            legal = follows(follower_hand, lead)
+            options = cards(representatives(legal, leader_hand) & legal)
+            # Cheapest winner first, then the lowest losers.
+            options.sort(key=lambda follow: (not beats(follow, lead), follow))
+            lead_key = key ^ CARD_KEYS[lead][leader]
+
+            trick_best = None
+            for follow in options:
+                low, high = alpha, beta
+                if trick_best is not None:
+                    if maximising:
+                        high = min(high, trick_best)
+                    else:
+                        low = max(low, trick_best)
+                new_hands, new_leader, new_score, new_won, _, new_pique = play_trick(
+                    hands, leader, score, won, played, pique, lead, follow)
+                delta = new_score[0] - new_score[1] - base
+                value = delta + self.search(new_hands, new_leader, new_score, new_won, played + 1, new_pique,
+                                            lead_key ^ CARD_KEYS[follow][follower], low - delta, high - delta)
+
+                # The follower picks the trick's value.
+                if trick_best is None or (value < trick_best if maximising else value > trick_best):
+                    trick_best = value
+                if maximising and trick_best <= alpha or not maximising and trick_best >= beta:
+                    break
+
+            if best is None or (trick_best > best if maximising else trick_best < best):
+                best, chosen = trick_best, lead
+            if maximising:
+                alpha = max(alpha, best)
+            else:
+                beta = min(beta, best)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if self.canonical:
+            chosen = permute_card(chosen, permutation)
+        self.table[index] = (full_key, flag, best, chosen)
+        return best
+
+
+def solve_deal(deal, lead_player, solver=None):
+    """
+    Solve the tricks left in a deal, with `lead_player` on lead. Scores and
+    tricks in the result are keyed by player.
+    """
+    players = [lead_player, deal.younger if lead_player is deal.elder else deal.elder]
+    result = (solver or Solver()).solve([player.mask for player in players], 0,
+                                        [deal.score[player] for player in players],
+                                        [deal.tricks[player] for player in players],
+                                        bool(deal.pique or deal.repique))
+    return {
+        'value': result['value'],
+        'score': dict(zip(players, result['score'])),
+        'tricks': dict(zip(players, result['tricks'])),
+        'play': [(lead, follow, players[winner]) for lead, follow, winner in result['play']]
+    }
@@ -0,0 +1,186 @@
+"""
+Statistics of many deals and parties, gathered as they finish.
+
+Nothing is kept per deal: scores go into running moments and fixed-bin
+histograms, and everything else into counts, so memory stays the same
+however many deals are added. Statistics from different processes merge.
+
+Scores are whole numbers, so the running moments are exact integer power
+sums rather than Welford's floating-point update. They give the same means
+and variances, and merging gives the same result in any order.
+"""
+from math import sqrt
+
+from core.game import Category
+
+
+class RunningStat:
+    """
+    Count, mean, variance and range of a stream of whole numbers.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.squares = 0
+        self.min = None
+        self.max = None
+
+    def __eq__(self, other):
+        return vars(self) == vars(other)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.squares += value * value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        self.count += other.count
+        self.sum += other.sum
+        self.squares += other.squares
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        """
+        The sample variance.
+        """
+        if self.count < 2:
+            return 0.0
+        return (self.count * self.squares - self.sum * self.sum) / (self.count * (self.count - 1))
+
+    @property
+    def stdev(self):
+        return sqrt(self.variance)
+
+    def summary(self):
+        return {'count': self.count, 'mean': self.mean, 'stdev': self.stdev, 'min': self.min, 'max': self.max}
+
+
+class FixedHistogram:
+    """
+    Counts in `bins` equal bins from `low` to `high`, with one more for values
+    below and one for values at or above.
+    """
+
+    def __init__(self, low, high, bins):
+        self.low = low
+        self.high = high
+        self.width = (high - low) / bins
+        self.counts = [0] * (bins + 2)
+
+    def __eq__(self, other):
+        return vars(self) == vars(other)
+
+    def add(self, value):
+        if value < self.low:
+            self.counts[0] += 1
+        elif value >= self.high:
+            self.counts[-1] += 1
+        else:
+            self.counts[1 + int((value - self.low) // self.width)] += 1
+
+    def merge(self, other):
+        if (self.low, self.high, len(self.counts)) != (other.low, other.high, len(other.counts)):
+            raise ValueError('Only histograms with the same bins can be merged.')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    def summary(self):
+        """
+        (lower edge, count) for each bin, starting with everything below `low`.
+        """
+        edges = [None] + [self.low + i * self.width for i in range(len(self.counts) - 1)]
+        return list(zip(edges, self.counts))
+
+
+SEATS = ('elder', 'younger')
+EVENTS = ('carte_blanche', 'pique', 'repique', 'caput')
+
+
+class Statistics:
+    """
+    What happened over many deals and parties, by seat for the deals.
+    """
+
+    def __init__(self):
+        self.deals = 0
+        self.parties = 0
+        self.rubicons = 0
+        self.deal_scores = {seat: RunningStat() for seat in SEATS}
+        self.deal_histograms = {seat: FixedHistogram(0, 300, 30) for seat in SEATS}
+        self.final_scores = RunningStat()
+        self.final_histogram = FixedHistogram(100, 700, 24)
+        self.declarations = {category: {seat: 0 for seat in SEATS + (None,)} for category in Category.categories}
+        self.events = {event: {seat: 0 for seat in SEATS} for event in EVENTS}
+
+    def __eq__(self, other):
+        return isinstance(other, Statistics) and vars(self) == vars(other)
+
+    def add_deal(self, deal):
+        seats = {deal.elder: 'elder', deal.younger: 'younger'}
+        self.deals += 1
+        for player, seat in seats.items():
+            self.deal_scores[seat].add(deal.score[player])
+            self.deal_histograms[seat].add(deal.score[player])
+        for category, winner in deal.declarations.items():
+            self.declarations[category][seats.get(winner)] += 1
+        for event in EVENTS:
+            player = getattr(deal, event)
+            if player:
+                self.events[event][seats[player]] += 1
+
+    def add_partie(self, partie):
+        """
+        Count a finished partie; its deals are added separately.
+        """
+        self.parties += 1
+        self.final_scores.add(partie.final_score)
+        self.final_histogram.add(partie.final_score)
+        if partie.score[partie.loser] < 100:
+            self.rubicons += 1
+
+    def merge(self, other):
+        self.deals += other.deals
+        self.parties += other.parties
+        self.rubicons += other.rubicons
+        for seat in SEATS:
+            self.deal_scores[seat].merge(other.deal_scores[seat])
+            self.deal_histograms[seat].merge(other.deal_histograms[seat])
+        self.final_scores.merge(other.final_scores)
+        self.final_histogram.merge(other.final_histogram)
+        for category, counts in other.declarations.items():
+            for seat, count in counts.items():
+                self.declarations[category][seat] += count
+        for event, counts in other.events.items():
+            for seat, count in counts.items():
+                self.events[event][seat] += count
+        return self
+
+    def summary(self):
+        deals = self.deals or 1
+        return {
+            'deals': self.deals,
+            'parties': self.parties,
+            'rubicon_rate': self.rubicons / self.parties if self.parties else 0.0,
+            'deal_scores': {seat: stat.summary() for seat, stat in self.deal_scores.items()},
+            'deal_histograms': {seat: histogram.summary() for seat, histogram in self.deal_histograms.items()},
+            'final_scores': self.final_scores.summary(),
+            'final_histogram': self.final_histogram.summary(),
+            'declarations': {category: {seat or 'nobody': count / deals for seat, count in counts.items()}
+                             for category, counts in self.declarations.items()},
+            'rates': {event: {seat: count / deals for seat, count in counts.items()}
+                      for event, counts in self.events.items()}
+        }
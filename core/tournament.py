@@ -0,0 +1,194 @@
+"""
+Round-robin tournaments between computer players.
+
+Every pair of entrants plays batches of headless parties on a pool of
+processes. After each batch, two sequential probability ratio tests ask
+whether either of the pair is stronger by `elo` points rather than level,
+and the pairing stops once one of them is, or both are clearly level.
+Ratings are fitted to all the results with the Bradley-Terry model and
+reported on the Elo scale with confidence intervals.
+
+Entrants are (player class, name) pairs, as for core.simulation; the class
+is called with the name and an `rng`, so a functools.partial will do for a
+player with other settings.
+"""
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import combinations
+from math import log
+
+import numpy as np
+
+from core.simulation import play_parties
+
+ELO_SCALE = 400 / log(10)
+
+
+def win_probability(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def sprt(wins, losses, elo0=0, elo1=30, alpha=0.05, beta=0.05):
+    """
+    Wald's test of a player being `elo1` points stronger than its opponent
+    against being `elo0` points stronger. Returns 1 once the first is
+    accepted, -1 once the second is, else 0, and the log-likelihood ratio.
+    """
+    p0, p1 = win_probability(elo0), win_probability(elo1)
+    llr = wins * log(p1 / p0) + losses * log((1 - p1) / (1 - p0))
+    if llr >= log((1 - beta) / alpha):
+        return 1, llr
+    if llr <= log(beta / (1 - alpha)):
+        return -1, llr
+    return 0, llr
+
+
+def bradley_terry(names, wins, prior=0.5, iterations=1000, tolerance=1e-10):
+    """
+    Fit Bradley-Terry strengths to a matrix of wins (row beat column) by
+    minorisation-maximisation. `prior` adds that many wins each way to every
+    pairing that was played, so that a perfect record still has a finite
+    rating. Returns each name's Elo rating, with the ratings averaging zero,
+    and its 95% confidence interval.
+    """
+    n = len(names)
+    wins = np.asarray(wins, dtype=float)
+    games = wins + wins.T
+    wins = wins + prior * (games > 0)
+    games = wins + wins.T
+    strengths = np.ones(n)
+    for _ in range(iterations):
+        updated = wins.sum(axis=1) / (games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+        updated /= np.exp(np.log(updated).mean())
+        converged = np.abs(updated - strengths).max() < tolerance
+        strengths = updated
+        if converged:
+            break
+
+    # The observed information of the log strengths, whose pseudo-inverse is
+    # their covariance with the ratings held to a zero mean.
+    p = strengths[:, None] / (strengths[:, None] + strengths[None, :])
+    weights = games * p * p.T
+    information = np.diag(weights.sum(axis=1)) - weights
+    covariance = np.linalg.pinv(information)
+
+    ratings = ELO_SCALE * np.log(strengths)
+    errors = ELO_SCALE * np.sqrt(np.maximum(np.diag(covariance), 0))
+    return {name: {'elo': float(rating), 'low': float(rating - 1.96 * error), 'high': float(rating + 1.96 * error)}
+            for name, rating, error in zip(names, ratings, errors)}
+
+
+class Tournament:
+    """
+    A round robin between `entrants`, each pairing playing at most
+    `max_games` parties in batches of `batch`.
+    """
+
+    def __init__(self, entrants, max_games=400, batch=20, elo=30, alpha=0.05, beta=0.05, seed=None):
+        if len({name for _, name in entrants}) != len(entrants):
+            raise ValueError('Tournament entrants need different names.')
+        self.entrants = list(entrants)
+        self.names = [name for _, name in entrants]
+        self.max_games = max_games
+        self.batch = batch
+        self.elo = elo
+        self.alpha = alpha
+        self.beta = beta
+        self.seed = seed
+        self.pairings = {pairing: {'games': 0, 'wins': [0, 0], 'final_score': [0, 0], 'llr': [0.0, 0.0],
+                                   'decided': False, 'stronger': None}
+                         for pairing in combinations(range(len(entrants)), 2)}
+
+    def next_batch(self, pairing):
+        """
+        The arguments to play_parties for a pairing's next batch, or None once
+        the pairing is over.
+        """
+        result = self.pairings[pairing]
+        if result['decided'] or result['games'] >= self.max_games:
+            return None
+        i, j = pairing
+        seed = None if self.seed is None else (self.seed, self.names[i], self.names[j])
+        size = min(self.batch, self.max_games - result['games'])
+        return [self.entrants[i], self.entrants[j]], size, None, seed, result['games']
+
+    def record(self, pairing, tally):
+        result = self.pairings[pairing]
+        result['games'] += tally['parties']
+        for k, index in enumerate(pairing):
+            result['wins'][k] += tally['wins'][self.names[index]]
+            result['final_score'][k] += tally['final_score'][self.names[index]]
+        wins, losses = result['wins']
+        first, result['llr'][0] = sprt(wins, losses, 0, self.elo, self.alpha, self.beta)
+        second, result['llr'][1] = sprt(losses, wins, 0, self.elo, self.alpha, self.beta)
+        if first > 0 or second > 0:
+            result['stronger'] = self.names[pairing[0] if first > 0 else pairing[1]]
+        result['decided'] = first > 0 or second > 0 or first == second == -1
+
+    def run(self, workers=None):
+        """
+        Play until every pairing is decided or has played its games. Each
+        pairing has one batch in play at a time, so with a seed the results
+        don't depend on the number of workers.
+        """
+        if workers == 1:
+            for pairing in self.pairings:
+                arguments = self.next_batch(pairing)
+                while arguments:
+                    self.record(pairing, play_parties(*arguments))
+                    arguments = self.next_batch(pairing)
+            return self.results()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            for pairing in self.pairings:
+                arguments = self.next_batch(pairing)
+                if arguments:
+                    running[executor.submit(play_parties, *arguments)] = pairing
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pairing = running.pop(future)
+                    self.record(pairing, future.result())
+                    arguments = self.next_batch(pairing)
+                    if arguments:
+                        running[executor.submit(play_parties, *arguments)] = pairing
+        return self.results()
+
+    def results(self):
+        n = len(self.names)
+        wins = np.zeros((n, n))
+        for (i, j), result in self.pairings.items():
+            wins[i, j], wins[j, i] = result['wins']
+        return {
+            'ratings': bradley_terry(self.names, wins),
+            'pairings': {(self.names[i], self.names[j]): result for (i, j), result in self.pairings.items()}
+        }
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from functools import partial
+    from core.players import Rabelais, Montaigne
+
+    parser = ArgumentParser(description='Play a round robin between the computer players.')
+    parser.add_argument('--games', type=int, default=200, help='most parties per pairing')
+    parser.add_argument('--batch', type=int, default=10)
+    parser.add_argument('--elo', type=float, default=50, help='difference the pairings test for')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    entrants = [(Rabelais, 'Rabelais'),
+                (partial(Montaigne, iterations=50), 'Montaigne-50'),
+                (partial(Montaigne, iterations=200), 'Montaigne-200')]
+    tournament = Tournament(entrants, args.games, args.batch, args.elo, seed=args.seed)
+    results = tournament.run(args.workers)
+
+    for (first, second), result in results['pairings'].items():
+        print('{} - {}: {}-{} after {} parties, {}'.format(
+            first, second, result['wins'][0], result['wins'][1], result['games'],
+            'stronger: {}'.format(result['stronger']) if result['stronger'] else
+            'level' if result['decided'] else 'undecided'))
+    ranking = sorted(results['ratings'].items(), key=lambda item: -item[1]['elo'])
+    for name, rating in ranking:
+        print('{:<16} {:+7.1f}  [{:+.1f}, {:+.1f}]'.format(name, rating['elo'], rating['low'], rating['high']))
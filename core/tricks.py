@@ -0,0 +1,140 @@
+"""
+Trick play on bitboards, for the search players and solvers.
+
+Cards are bit indices as in core.game.DECK and hands are masks. The two
+players are numbered 0 and 1; scores and trick counts are indexed the same way.
+"""
+from core.game import SUIT_MASKS, SUIT_SHIFTS, HOLDING_BITS, Suit
+
+# The mask of each card's suit, indexed by card.
+SUIT_OF = tuple(SUIT_MASKS[suit] for suit in Suit.suits for _ in range(8))
+
+
+def cards(mask):
+    """
+    The card indices in a mask, lowest first.
+    """
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+def follows(hand, lead):
+    """
+    The cards that may be played to a lead: the cards of its suit, or else any.
+    """
+    return (hand & SUIT_OF[lead]) or hand
+
+
+def beats(follow, lead):
+    return follow > lead and SUIT_OF[follow] == SUIT_OF[lead]
+
+
+class CardTracker:
+    """
+    The cards a player has seen in a deal, its own included, as a mask that
+    grows a card at a time. Everything else it knows of a suit, such as its
+    highest card still outstanding, comes from that suit's byte of the mask.
+    """
+    __slots__ = ('seen',)
+
+    def __init__(self):
+        self.seen = 0
+
+    def see(self, card):
+        self.seen |= card.bit
+
+    def unseen(self, suit):
+        return ~self.seen >> SUIT_SHIFTS[suit] & 0xFF
+
+    def highest_outstanding(self, suit):
+        """
+        The rank (0 for the Seven) of the highest card not yet seen, or -1.
+        """
+        ranks = HOLDING_BITS[self.unseen(suit)]
+        return ranks[-1] if ranks else -1
+
+    def winners(self, holding, suit):
+        """
+        The cards of a holding above every card still outstanding in the suit.
+        """
+        above = self.highest_outstanding(suit) + 1
+        return holding >> above << above
+
+
+class TrickState:
+    """
+    The trick phase of a deal, scored as Deal.play_trick scores it.
+
+    `score` holds everything already scored in the deal, since pique depends on
+    it, and `pique` is whether pique (or repique) can no longer happen.
+    """
+    __slots__ = ('hands', 'leader', 'lead', 'score', 'tricks', 'pique')
+
+    def __init__(self, hands, leader, score=(0, 0), tricks=(0, 0), pique=False, lead=None):
+        self.hands = list(hands)
+        self.leader = leader
+        self.lead = lead
+        self.score = list(score)
+        self.tricks = list(tricks)
+        self.pique = pique
+
+    def copy(self):
+        return TrickState(self.hands, self.leader, self.score, self.tricks, self.pique, self.lead)
+
+    @property
+    def finished(self):
+        return not (self.hands[0] or self.hands[1]) and self.lead is None
+
+    @property
+    def to_move(self):
+        return self.leader if self.lead is None else 1 - self.leader
+
+    def moves(self):
+        if self.lead is None:
+            return self.hands[self.leader]
+        return follows(self.hands[1 - self.leader], self.lead)
+
+    def play(self, card):
+        """
+        Play a card for whoever is to move. Returns the winner once a trick is
+        complete, otherwise None.
+        """
+        player = self.to_move
+        self.hands[player] &= ~(1 << card)
+        if self.lead is None:
+            self.lead = card
+            return None
+        winner = self.play_trick(self.lead, card)
+        self.lead = None
+        return winner
+
+    def play_trick(self, lead, follow):
+        leader = self.leader
+        score, tricks = self.score, self.tricks
+        score[leader] += 1
+
+        if beats(follow, lead):
+            winner = 1 - leader
+            score[winner] += 1
+        else:
+            winner = leader
+        loser = 1 - winner
+        tricks[winner] += 1
+
+        if not self.pique and score[winner] >= 30 and score[loser] == 0:
+            score[winner] += 30
+            self.pique = True
+
+        if not self.hands[leader]:
+            score[winner] += 1
+            if tricks[winner] == 12:
+                score[winner] += 40
+            elif tricks[winner] != 6:
+                score[0 if tricks[0] > tricks[1] else 1] += 10
+
+        self.leader = winner
+        return winner
@@ -0,0 +1,132 @@
+"""
+Declaration scoring over arrays of hands.
+
+Hands are 32-bit bitboards laid out as in core.game: one byte per suit in the
+order of Suit.suits, Seven in the lowest bit. Every function takes either an
+(N,) array of such masks or an (N, 32) boolean array with one column per bit,
+and follows the same rules as Player.point, Player.sequences, Player.sets and
+Deal.score_declarations.
+
+The `second` arrays hold what Result compares after `first`: the pips of the
+point, and the rank value of the lowest card of the best sequence or of the
+best set. They are 0 when there is nothing to declare.
+"""
+import numpy as np
+
+from core.game import (Category, SCORE_VALUES, SUIT_SHIFTS, COURTS_MASK, SET_RANKS,
+                       HOLDING_LENGTH, HOLDING_PIPS, HOLDING_RUN, HOLDING_RUN_TOP)
+
+LENGTHS = np.array(HOLDING_LENGTH, dtype=np.int16)
+PIPS = np.array(HOLDING_PIPS, dtype=np.int16)
+RUNS = np.array(HOLDING_RUN, dtype=np.int16)
+RUN_LOWS = np.array([top - run + 8 if run else 0 for run, top in zip(HOLDING_RUN, HOLDING_RUN_TOP)],
+                    dtype=np.int16)
+
+
+def score_table(category):
+    values = SCORE_VALUES[category]
+    table = np.zeros(max(values) + 1, dtype=np.int16)
+    for first, value in values.items():
+        table[first] = value
+    return table
+
+POINT_VALUES = score_table(Category.POINT)
+SEQUENCE_VALUES = score_table(Category.SEQUENCES)
+SET_VALUES = score_table(Category.SETS)
+
+
+def as_masks(hands):
+    hands = np.asarray(hands)
+    if hands.ndim == 2:
+        if hands.shape[1] != 32:
+            raise ValueError('Hands must have one column per card, not {}.'.format(hands.shape[1]))
+        weights = np.left_shift(np.uint64(1), np.arange(32, dtype=np.uint64))
+        return (hands.astype(np.uint64) * weights).sum(axis=1).astype(np.uint32)
+    return hands.astype(np.uint32)
+
+
+def holdings(masks):
+    """
+    The (N, 4) array of suit holdings of each hand.
+    """
+    masks = as_masks(masks)
+    return np.stack([(masks >> np.uint32(shift)) & np.uint32(0xFF) for shift in SUIT_SHIFTS.values()],
+                    axis=1).astype(np.intp)
+
+
+def carte_blanche(hands):
+    return (as_masks(hands) & np.uint32(COURTS_MASK)) == 0
+
+
+def point(hands):
+    suits = holdings(hands)
+    lengths = LENGTHS[suits]
+    keys = lengths * 128 + PIPS[suits]
+    best = keys.max(axis=1)
+    first = best // 128
+    first = np.where(first >= 4, first, 0)
+    second = np.where(first >= 4, best % 128, 0)
+    return {'first': first, 'second': second, 'value': POINT_VALUES[first]}
+
+
+def sequences(hands):
+    suits = holdings(hands)
+    runs = RUNS[suits]
+    runs = np.where(runs >= 3, runs, 0)
+    keys = runs * 16 + np.where(runs >= 3, RUN_LOWS[suits], 0)
+    best = keys.max(axis=1)
+    return {'first': best // 16, 'second': best % 16, 'value': SEQUENCE_VALUES[runs].sum(axis=1)}
+
+
+def sets(hands):
+    masks = as_masks(hands)
+    counts = np.stack([sum(((masks >> np.uint32(shift + offset)) & np.uint32(1)).astype(np.int16)
+                           for shift in SUIT_SHIFTS.values())
+                       for _, offset in SET_RANKS], axis=1)
+    counts = np.where(counts >= 3, counts, 0)
+    ranks = np.array([rank.value for rank, _ in SET_RANKS], dtype=np.int16)
+    keys = counts * 16 + np.where(counts >= 3, ranks, 0)
+    best = keys.max(axis=1)
+    return {'first': best // 16, 'second': best % 16, 'value': SET_VALUES[counts].sum(axis=1)}
+
+DECLARATIONS = {
+    Category.POINT: point,
+    Category.SEQUENCES: sequences,
+    Category.SETS: sets
+}
+
+
+def declare(hands, category):
+    return DECLARATIONS[category](hands)
+
+
+def score_declarations(elder, younger, elder_score=0, younger_score=0):
+    """
+    Score the declarations and repique between pairs of hands, as
+    Deal.score_declarations does. `elder_score` and `younger_score` are the
+    points already held, such as carte blanche.
+
+    Returns the (N,) scores of each player, the winner of each category
+    (1 for the elder, 2 for the younger, 0 when equal) and the repique, in the
+    same encoding.
+    """
+    elder, younger = as_masks(elder), as_masks(younger)
+    n = len(elder)
+    scores = [np.zeros(n, dtype=np.int32) + elder_score, np.zeros(n, dtype=np.int32) + younger_score]
+    winners = {}
+
+    for category in Category.categories:
+        mine, theirs = declare(elder, category), declare(younger, category)
+        my_key = mine['first'].astype(np.int32) * 128 + mine['second']
+        their_key = theirs['first'].astype(np.int32) * 128 + theirs['second']
+        winner = np.where(my_key > their_key, 1, np.where(my_key < their_key, 2, 0))
+        scores[0] += np.where(winner == 1, mine['value'], 0)
+        scores[1] += np.where(winner == 2, theirs['value'], 0)
+        winners[category] = winner
+
+    repique = np.where((scores[0] >= 30) & (scores[1] == 0), 1,
+                       np.where((scores[1] >= 30) & (scores[0] == 0), 2, 0))
+    scores[0] += np.where(repique == 1, 60, 0)
+    scores[1] += np.where(repique == 2, 60, 0)
+
+    return {'elder': scores[0], 'younger': scores[1], 'winners': winners, 'repique': repique}
@@ -2,6 +2,7 @@ from core.server import Server, Rabelais, Partie
 
 
 class Viewer(Rabelais):
+    listens = True
 
     def announce(self, message):
         super().announce(message)
@@ -0,0 +1,56 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase
+from core.async_server import AsyncServer
+
+
+async def play_client(port, name, opponent='rabelais'):
+    """
+    A client that keeps its cards and plays the first legal card it holds.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(json.dumps({'type': 'join', 'name': name, 'opponent': opponent}).encode() + b'\n')
+    errors = 0
+    while True:
+        message = json.loads(await reader.readline())
+        if message['type'] == 'end':
+            writer.close()
+            return message, errors
+        if message['type'] == 'error':
+            errors += 1
+        if message['type'] == 'request':
+            hand = message['hand']
+            if message['action'] in ('elder_exchange', 'younger_exchange'):
+                cards = hand[:message['min']]
+            elif message['action'] == 'follow':
+                suited = [card for card in hand if card[1] == message['lead'][1]]
+                cards = (suited or hand)[:1]
+            else:
+                cards = hand[:1]
+            writer.write(json.dumps({'type': 'cards', 'cards': cards}).encode() + b'\n')
+            await writer.drain()
+
+
+class TestAsyncServer(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = AsyncServer()
+        self.listener = await asyncio.start_server(self.server.handle, '127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.executor.shutdown()
+
+    async def test_tables(self):
+        results = await asyncio.gather(*[play_client(self.port, 'Player {}'.format(i)) for i in range(4)])
+        for end, errors in results:
+            self.assertEqual(errors, 0)
+            self.assertGreaterEqual(end['final_score'], 100)
+
+    async def test_human_opponents(self):
+        first, second = await asyncio.gather(play_client(self.port, 'Marcus', 'human'),
+                                             play_client(self.port, 'Vergil', 'human'))
+        self.assertEqual(first[0], second[0])
+        self.assertIn(first[0]['winner'], ('Marcus', 'Vergil'))
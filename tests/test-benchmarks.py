@@ -0,0 +1,35 @@
+from unittest import TestCase
+from core.benchmarks import BENCHMARKS, run_benchmarks, welch_test, compare
+
+
+class TestBenchmarks(TestCase):
+
+    def test_welch_test(self):
+        t, p = welch_test([1.0, 2.0, 3.0, 4.0], [3.0, 4.0, 5.0, 6.0])
+        self.assertAlmostEqual(t, 2.1909, places=4)
+        self.assertAlmostEqual(p, 0.0710, places=4)
+        self.assertEquals(welch_test([1.0, 1.0], [1.0, 1.0]), (0.0, 1.0))
+
+    def test_compare(self):
+        baseline = {'benchmarks': {
+            'fast': {'mean': 1.0, 'samples': [0.9, 1.0, 1.1] * 5},
+            'noisy': {'mean': 1.0, 'samples': [0.5, 1.0, 1.5] * 5},
+            'slow': {'mean': 1.0, 'samples': [0.9, 1.0, 1.1] * 5},
+        }}
+        results = {'benchmarks': {
+            'fast': {'mean': 0.5, 'samples': [0.45, 0.5, 0.55] * 5},
+            'noisy': {'mean': 1.1, 'samples': [0.6, 1.1, 1.6] * 5},
+            'slow': {'mean': 1.5, 'samples': [1.4, 1.5, 1.6] * 5},
+            'new': {'mean': 1.0, 'samples': [1.0, 1.0]},
+        }}
+        report = compare(baseline, results)
+        self.assertEquals({name: entry['status'] for name, entry in report.items()},
+                          {'fast': 'faster', 'noisy': 'unchanged', 'slow': 'slower'})
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(['point', 'play_trick'], samples=2)
+        self.assertEquals(set(results['benchmarks']), {'point', 'play_trick'})
+        for result in results['benchmarks'].values():
+            self.assertEquals(len(result['samples']), 2)
+            self.assertGreater(result['mean'], 0)
+        self.assertIn('play_a_game', BENCHMARKS)
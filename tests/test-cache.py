@@ -0,0 +1,108 @@
+import os
+import tempfile
+from random import Random
+from unittest import TestCase
+
+from core.cache import DecisionCache, read_table
+from core.canonical import canonical_hand, permute
+from core.game import DECK
+from core.players import Rabelais
+from core.simulation import simulate
+
+
+class Reversed(Rabelais):
+    """
+    Discards the cards Rabelais would keep.
+    """
+
+    def evaluate_hand(self):
+        evaluation = super().evaluate_hand()
+        evaluation['cards'].reverse()
+        return evaluation
+
+
+class Stubborn(Rabelais):
+    """
+    Keeps the cards it was told to, whatever Rabelais would discard.
+    """
+
+    def __init__(self, name, keep, **kwargs):
+        super().__init__(name, **kwargs)
+        self.keep = keep
+
+    def evaluate_hand(self):
+        evaluation = super().evaluate_hand()
+        evaluation['cards'].sort(key=lambda card: card.rank == self.keep)
+        return evaluation
+
+
+class TestCache(TestCase):
+
+    def test_layers(self):
+        calls = []
+
+        def decide(value):
+            return lambda: calls.append(value) or value
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'table.npy')
+            cache = DecisionCache(path, size=2)
+            self.assertEquals([cache.lookup(key, decide(key * 10)) for key in (1, 2, 3, 1)], [10, 20, 30, 10])
+            self.assertEquals(calls, [10, 20, 30, 10])
+            self.assertEquals(len(cache.recent), 2)
+            cache.save()
+
+            reopened = DecisionCache(path, size=2)
+            self.assertEquals([reopened.lookup(key, decide(0)) for key in (3, 1, 2, 1 << 40)], [30, 10, 20, 0])
+            self.assertEquals(reopened.cache_info()['table_hits'], 3)
+            self.assertEquals(reopened.cache_info()['misses'], 1)
+            self.assertEquals(list(read_table(path)[0]), [1, 2, 3])
+
+    def test_cached_exchange(self):
+        rng = Random(2)
+        cache = DecisionCache()
+        for _ in range(20):
+            hand = rng.sample(DECK, 12)
+            twin = permute(sum(card.bit for card in hand), (2, 0, 3, 1))
+            first, second = Rabelais('Marcus', exchange_cache=cache), Rabelais('Vergil', exchange_cache=cache)
+            first.draw(hand)
+            second.draw([card for card in DECK if card.bit & twin])
+            discards = sum(card.bit for card in first.get_elder_exchange())
+            self.assertEquals(bin(discards).count('1'), 5)
+            self.assertEquals(discards & ~first.mask, 0)
+            twin_discards = sum(card.bit for card in second.get_elder_exchange())
+            # Suits with the same holding may swap, so the hands kept are
+            # twins rather than exactly the same.
+            self.assertEquals(canonical_hand(first.mask & ~discards)[0],
+                              canonical_hand(second.mask & ~twin_discards)[0])
+        self.assertEquals(cache.cache_info()['hits'], 20)
+
+    def test_strategies_kept_apart(self):
+        hand = Random(3).sample(DECK, 12)
+        cache = DecisionCache()
+        players = (Rabelais('Marcus', exchange_cache=cache), Reversed('Vergil', exchange_cache=cache))
+        for player in players:
+            player.draw(hand)
+        exchanges = [sum(card.bit for card in player.get_elder_exchange()) for player in players]
+        self.assertEquals(cache.cache_info()['misses'], 2)
+        self.assertNotEquals(exchanges[0], exchanges[1])
+
+    def test_constructor_arguments(self):
+        hand = Random(4).sample(DECK, 12)
+        player = Stubborn('Marcus', hand[0].rank, exchange_cache=DecisionCache())
+        player.draw(hand)
+        discards = player.get_elder_exchange()
+        self.assertEquals(len(discards), 5)
+        self.assertFalse(any(card.rank == hand[0].rank for card in discards))
+        self.assertEquals(player.mask, sum(card.bit for card in hand))
+
+    def test_simulation_table(self):
+        entrants = [(Rabelais, 'Marcus'), (Rabelais, 'Vergil')]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'exchanges.npy')
+            cold = simulate(entrants, 3, workers=1, seed=8, exchange_cache=path)
+            self.assertEquals(read_table(path).shape[1], 2 * cold['deals'])
+            warm = simulate(entrants, 3, workers=1, seed=8, exchange_cache=path)
+            self.assertEquals(warm['wins'], cold['wins'])
+            self.assertEquals(read_table(path).shape[1], 2 * cold['deals'])
+        self.assertIsNone(Rabelais.exchange_cache)
@@ -0,0 +1,73 @@
+from itertools import permutations
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from core.canonical import (canonical_hand, canonical_pair, canonical_state, canonical_arrays, canonical, permute,
+                            restore, permute_card, restore_card)
+from core.game import DECK, DECK_MASK
+
+
+def random_hand(rng, size=12):
+    return sum(card.bit for card in rng.sample(DECK, size))
+
+
+class TestCanonical(TestCase):
+
+    def test_canonical_hand(self):
+        rng = Random(4)
+        for _ in range(50):
+            hand = random_hand(rng)
+            key, permutation = canonical_hand(hand)
+            self.assertEquals(restore(key, permutation), hand)
+            self.assertEquals(permute(hand, permutation), key)
+            for twin in permutations(range(4)):
+                self.assertEquals(canonical_hand(permute(hand, twin))[0], key)
+
+    def test_holdings_descend(self):
+        key, permutation = canonical_hand(0x01 | 0xF0 << 8 | 0x0C << 24)
+        self.assertEquals(key, 0xF0 | 0x0C << 8 | 0x01 << 16)
+        self.assertEquals(permutation[:3], (1, 3, 0))
+
+    def test_canonical_pair(self):
+        rng = Random(5)
+        for _ in range(50):
+            dealt = rng.sample(range(32), 16)
+            first, second = sum(1 << c for c in dealt[:8]), sum(1 << c for c in dealt[8:])
+            pair, permutation = canonical_pair(first, second)
+            self.assertEquals((pair, permutation), canonical(first, second))
+            self.assertEquals((restore(pair[0], permutation), restore(pair[1], permutation)), (first, second))
+            for twin in permutations(range(4)):
+                self.assertEquals(canonical_pair(permute(first, twin), permute(second, twin))[0], pair)
+
+    def test_cards(self):
+        permutation = (2, 0, 3, 1)
+        for index in range(32):
+            card = permute_card(index, permutation)
+            self.assertEquals(1 << card, permute(1 << index, permutation))
+            self.assertEquals(restore_card(card, permutation), index)
+
+    def test_canonical_state(self):
+        rng = Random(6)
+        hand = random_hand(rng, 7)
+        lead = rng.choice([card.index for card in DECK if not card.bit & hand])
+        info = {'hand': hand, 'unseen': DECK_MASK & ~hand & ~(1 << lead), 'excluded': 0xFF << 16,
+                'opponent_size': 6, 'leader': 1, 'lead': lead, 'score': (12, 3), 'tricks': (2, 3), 'pique': False}
+        key, permutation = canonical_state(info)
+        self.assertEquals(key[3], permute_card(lead, permutation))
+        for twin in permutations(range(4)):
+            other = dict(info, hand=permute(hand, twin), unseen=permute(info['unseen'], twin),
+                         excluded=permute(info['excluded'], twin), lead=permute_card(lead, twin))
+            self.assertEquals(canonical_state(other)[0], key)
+        self.assertNotEquals(canonical_state(dict(info, lead=None))[0], key)
+
+    def test_canonical_arrays(self):
+        rng = Random(7)
+        firsts = [random_hand(rng) for _ in range(100)]
+        seconds = [random_hand(rng, 8) for _ in range(100)]
+        (first_keys, second_keys), suit_orders = canonical_arrays(firsts, seconds)
+        for first, second, first_key, second_key, permutation in zip(firsts, seconds, first_keys, second_keys,
+                                                                     suit_orders):
+            self.assertEquals(canonical(first, second), ((first_key, second_key), tuple(permutation)))
+        self.assertEquals(first_keys.dtype, np.uint32)
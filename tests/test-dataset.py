@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from core.dataset import Dataset, ShardWriter, decision_records, RECORD
+from core.players import Rabelais
+from core.simulation import HeadlessServer, play_parties
+
+
+class Watched(Rabelais):
+    """
+    Notes its hand, what its tracker has seen and its action at each decision.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.decisions = []
+
+    def get_elder_exchange(self):
+        mask, seen = self.mask, self.tracker.seen
+        cards = super().get_elder_exchange()
+        self.decisions.append((0, -1, mask, seen, sum(card.bit for card in cards)))
+        return cards
+
+    def get_younger_exchange(self, max_cards):
+        mask, seen = self.mask, self.tracker.seen
+        cards = super().get_younger_exchange(max_cards)
+        self.decisions.append((1, -1, mask, seen, sum(card.bit for card in cards)))
+        return cards
+
+    def get_lead(self):
+        mask, seen = self.mask, self.tracker.seen
+        card = super().get_lead()
+        self.decisions.append((2, -1, mask, seen, card.index))
+        return card
+
+    def get_follow(self, lead_card):
+        mask, seen = self.mask, self.tracker.seen
+        card = super().get_follow(lead_card)
+        self.decisions.append((3, lead_card.index, mask, seen, card.index))
+        return card
+
+
+class TestDataset(TestCase):
+
+    def test_decision_records(self):
+        players = (Watched('Marcus'), Watched('Vergil'))
+        server = HeadlessServer(*players)
+        deals = []
+        server.recorder = type('Keep', (), {'write': lambda self, deal, seats: deals.append(deal)})()
+        server.play_a_game()
+
+        records = np.concatenate([decision_records(deal, players) for deal in deals])
+        self.assertEquals(len(records), 26 * len(deals))
+        for seat, player in enumerate(players):
+            mine = records[records['seat'] == seat]
+            self.assertEquals([tuple(int(x) for x in row) for row in
+                               zip(mine['decision'], mine['lead'], mine['hand'], mine['seen'], mine['action'])],
+                              player.decisions)
+        first = decision_records(deals[0], players)
+        elder = players.index(deals[0].elder)
+        self.assertEquals(list(first[0]['score']), [deals[0].score[deals[0].elder], deals[0].score[deals[0].younger]])
+        self.assertTrue(first[first['seat'] == elder]['elder'].all())
+
+    def test_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tally = play_parties([(Rabelais, 'Marcus'), (Rabelais, 'Vergil')], 2, seed=5, dataset=directory)
+            dataset = Dataset(directory)
+            self.assertEquals(len(dataset), 26 * tally['deals'])
+            self.assertEquals(dataset[0].dtype, RECORD)
+            self.assertEquals(dataset[-1], dataset[len(dataset) - 1])
+            self.assertEquals(dataset[[-1, 0]].tobytes(), dataset[[len(dataset) - 1, 0]].tobytes())
+            for index in (len(dataset), -len(dataset) - 1):
+                with self.assertRaises(IndexError):
+                    dataset[index]
+                with self.assertRaises(IndexError):
+                    dataset[[0, index]]
+
+            batches = list(dataset.batches(100, np.random.default_rng(0)))
+            everything = np.concatenate(batches)
+            self.assertEquals(len(everything), len(dataset))
+            self.assertEquals(sorted(record.tobytes() for record in everything),
+                              sorted(record.tobytes() for record in dataset[np.arange(len(dataset))]))
+
+        with tempfile.TemporaryDirectory() as directory:
+            with ShardWriter(directory, shard_size=100) as writer:
+                server = HeadlessServer(Rabelais('Marcus'), Rabelais('Vergil'), recorder=writer)
+                server.play_a_game()
+            dataset = Dataset(directory)
+            self.assertEquals(len(dataset.shards), -(-len(dataset) // 100))
+            self.assertEquals(len(dataset.shards[0]), 100)
+
+    def test_shards_appended(self):
+        entrants = [(Rabelais, 'Marcus'), (Rabelais, 'Vergil')]
+        with tempfile.TemporaryDirectory() as directory:
+            first = play_parties(entrants, 1, seed=5, dataset=directory)
+            second = play_parties(entrants, 1, seed=6, dataset=directory)
+            np.save(os.path.join(directory, 'weights.npy'), np.zeros(3))
+            self.assertEquals(sorted(os.listdir(directory)), ['shard-00000.npy', 'shard-00001.npy', 'weights.npy'])
+            self.assertEquals(len(Dataset(directory)), 26 * (first['deals'] + second['deals']))
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import numpy as np
+
+from core.environment import VectorEnv, random_actions, ELDER_EXCHANGE, LEAD, FOLLOW
+from core.game import Deal, Deck, Partie, DECK
+from core.players import Rabelais
+
+
+def replay(order, actions):
+    elder, younger = Rabelais('Marcus'), Rabelais('Vergil')
+    partie = Partie(elder, younger)
+    deal = Deal(partie, elder, younger, deck=Deck([DECK[i] for i in order], shuffled=False))
+    deal.deal()
+    for player, discards in zip((elder, younger), actions[:2]):
+        deal.exchange(player, [card for card in DECK if card.bit & int(discards)])
+    deal.score_declarations()
+
+    lead, follow = elder, younger
+    plays = iter(actions[2:])
+    for lead_index, follow_index in zip(plays, plays):
+        result = deal.play_trick({'player': lead, 'card': DECK[lead_index]},
+                                 {'player': follow, 'card': DECK[follow_index]})
+        if result['winner'] is not lead:
+            lead, follow = follow, lead
+    return deal, elder, younger
+
+
+class TestEnvironment(TestCase):
+
+    def test_matches_deal(self):
+        rng = np.random.default_rng(3)
+        env = VectorEnv(200, autoreset=False)
+        orders = rng.permuted(np.tile(np.arange(32), (200, 1)), axis=1)
+        observation = env.reset(orders=orders)
+        steps, rewards, done = [], np.zeros((200, 2)), np.zeros(200, dtype=bool)
+        while not done.all():
+            actions = random_actions(observation, rng)
+            steps.append(actions)
+            observation, reward, done, info = env.step(actions)
+            rewards += reward
+        self.assertEquals(len(steps), 26)
+
+        steps = np.array(steps).T
+        for table in range(200):
+            deal, elder, younger = replay(orders[table], steps[table])
+            self.assertEquals(list(info['final_score'][table]), [deal.score[elder], deal.score[younger]])
+            self.assertEquals(list(info['tricks'][table]), [deal.tricks[elder], deal.tricks[younger]])
+        self.assertTrue(np.array_equal(rewards, info['final_score']))
+
+    def test_legal_actions(self):
+        env = VectorEnv(2, seed=1)
+        observation = env.reset()
+        self.assertTrue((observation['phase'] == ELDER_EXCHANGE).all())
+        self.assertTrue((observation['max_discards'] == 5).all())
+        self.assertTrue(np.array_equal(observation['legal'], observation['hand']))
+        with self.assertRaises(ValueError):
+            env.step([(1 << 32) - 1, 0])
+
+        observation, _, _, _ = env.step([0, 0])
+        self.assertTrue((observation['max_discards'] == 8).all())
+        observation, _, _, _ = env.step([0, 0])
+        self.assertTrue((observation['phase'] == LEAD).all())
+
+        lead = np.argmax(observation['legal'], axis=1)
+        observation, _, _, _ = env.step(lead)
+        self.assertTrue((observation['phase'] == FOLLOW).all())
+        for table in range(2):
+            suited = observation['hand'][table] & (np.arange(32) // 8 == lead[table] // 8)
+            expected = suited if suited.any() else observation['hand'][table]
+            self.assertTrue(np.array_equal(observation['legal'][table], expected))
+        with self.assertRaises(ValueError):
+            env.step(lead)
+
+    def test_autoreset(self):
+        env = VectorEnv(4, seed=2)
+        observation = env.reset()
+        rng = np.random.default_rng(0)
+        for _ in range(26):
+            observation, _, done, info = env.step(random_actions(observation, rng))
+        self.assertTrue(done.all())
+        self.assertTrue((info['tricks'].sum(axis=1) == 12).all())
+        self.assertTrue((observation['phase'] == ELDER_EXCHANGE).all())
+        self.assertEquals(observation['hand'].sum(), 48)
@@ -0,0 +1,65 @@
+from unittest import TestCase
+from core.events import EventBus, Event, CardPlayed, TrickWon, DealScore, PartieWon, Exchanged, CarteBlanche
+from core.game import Partie
+from core.players import Rabelais
+from core.server import Server
+
+
+class Listener(Rabelais):
+    listens = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = []
+
+    def announce(self, message):
+        self.messages.append(message)
+
+
+class Robot(Server):
+    def __init__(self, player1, player2, events=None):
+        self.players = {player1, player2}
+        self.partie = Partie(player1, player2)
+        self.events = events
+
+
+class TestEvents(TestCase):
+
+    def test_carte_blanche(self):
+        # The younger's message used to read "carte_blanche"; both seats now
+        # get the elder's wording.
+        self.assertEquals(str(CarteBlanche(Rabelais('Vergil'))), 'Vergil is carte blanche.')
+
+    def test_bus(self):
+        bus = EventBus()
+        events, plays = [], []
+        bus.subscribe(events.append)
+        bus.subscribe(plays.append, CardPlayed)
+        server = Robot(Rabelais('Barry Lyndon'), Rabelais('Rabelais'), bus)
+        server.play_a_game()
+
+        self.assertEquals(len(plays), 6 * 24)
+        self.assertTrue(all(isinstance(event, Event) for event in events))
+        self.assertEquals(sum(isinstance(event, TrickWon) for event in events), 6 * 12)
+        self.assertIsInstance(events[-1], PartieWon)
+        self.assertIn(' won with {}.'.format(server.partie.final_score), str(events[-1]))
+
+        bus.unsubscribe(events.append)
+        bus.unsubscribe(plays.append)
+        self.assertFalse(bus)
+
+    def test_listeners(self):
+        listener = Listener('Rabelais')
+        quiet = Rabelais('Barry Lyndon')
+        quiet.announce = lambda message: self.fail('Rabelais does not listen')
+        Robot(listener, quiet).play_a_game()
+        self.assertIn('Rabelais takes the trick.', [str(message) for message in listener.messages])
+
+    def test_rendering(self):
+        player = Rabelais('Rabelais')
+        score = {player: 3}
+        event = DealScore(score)
+        score[player] = 10
+        self.assertEquals(str(event), '{Rabelais: 3}')
+        self.assertEquals(str(Exchanged(player, 5)), 'Rabelais exchanges 5 cards.')
+        self.assertEquals(repr(Exchanged(player, 5)), 'Exchanged(Rabelais, 5)')
@@ -0,0 +1,42 @@
+from itertools import combinations
+from random import Random
+from unittest import TestCase
+import numpy as np
+from core import vectorized
+from core.exchange import expected_values, best_exchange, evaluate_exchange
+from core.game import Category, DECK_MASK
+from core.tricks import cards
+
+
+def random_hand(rng):
+    return sum(1 << card for card in rng.sample(range(32), 12))
+
+
+class TestExchange(TestCase):
+
+    def test_expected_values_are_exact(self):
+        rng = Random(2)
+        for drawn in range(3):
+            hand = random_hand(rng)
+            unseen = DECK_MASK & ~hand
+            kept = hand & ~sum(1 << card for card in rng.sample(cards(hand), drawn))
+            draws = [kept | sum(1 << card for card in draw) for draw in combinations(cards(unseen), drawn)]
+            expected = expected_values(kept, unseen, drawn)
+            for category in Category.categories:
+                values = vectorized.declare(np.array(draws, dtype=np.uint32), category)['value']
+                self.assertAlmostEqual(expected[category], values.mean())
+
+    def test_best_exchange(self):
+        rng = Random(3)
+        hand = random_hand(rng)
+        keep = sum(1 << card for card in cards(hand)[:4])
+        discard, evaluation = best_exchange(hand, max_cards=5, min_cards=5, keep=keep, rng=rng)
+        self.assertEquals(len(cards(discard)), 5)
+        self.assertEquals(discard & ~hand, 0)
+        self.assertEquals(discard & keep, 0)
+        self.assertTrue(0 <= evaluation['repique'] <= 1)
+
+        hand = 0xFF | 0xF0 << 8  # every diamond and four high hearts
+        discard, evaluation = best_exchange(hand, max_cards=3, rng=rng)
+        self.assertEquals(discard, 0)
+        self.assertEquals(evaluation, evaluate_exchange(hand, 0))
@@ -0,0 +1,56 @@
+from contextlib import ExitStack
+from unittest import TestCase
+from unittest.mock import patch
+from core.game import Partie
+from core.metrics import Metrics, Histogram
+from core.players import Rabelais
+from core.server import Server
+
+
+class Robot(Server):
+    def __init__(self, metrics=None):
+        player1 = Rabelais('Barry Lyndon')
+        player2 = Rabelais('Rabelais')
+        self.players = {player1, player2}
+        self.partie = Partie(player1, player2)
+        self.metrics = metrics
+
+
+class TestMetrics(TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertEquals(histogram.cumulative(), [(0.1, 2), (1, 3), (float('inf'), 4)])
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+    def test_server_metrics(self):
+        metrics = Metrics()
+        for i in range(3):
+            Robot(metrics).play_a_game()
+        snapshot = metrics.snapshot()
+
+        self.assertEquals(snapshot['counters']['games'], 3)
+        self.assertEquals(snapshot['counters']['deals'], 18)
+        self.assertEquals(set(snapshot['phases']), {'deal', 'exchange', 'declarations', 'tricks'})
+        self.assertEquals(snapshot['phases']['tricks']['count'], 18)
+        leads = sum(snapshot['decisions'][name]['count']
+                    for name in ('Barry Lyndon.get_lead', 'Rabelais.get_lead'))
+        self.assertEquals(leads, 18 * 12)
+
+        text = metrics.prometheus()
+        self.assertIn('pyquet_deals_total 18', text)
+        self.assertIn('pyquet_decision_seconds_count{player="Rabelais",decision="get_follow"}', text)
+        self.assertIn('le="+Inf"', text)
+
+    def test_disabled(self):
+        with ExitStack() as stack:
+            hooks = [stack.enter_context(patch.object(Metrics, name))
+                     for name in ('count', 'phase', 'observe', 'decide', 'count_deal')]
+            server = Robot()
+            server.play_a_game()
+        self.assertIsNone(Server.metrics)
+        self.assertEquals(len(server.partie.deals), 6)
+        for hook in hooks:
+            hook.assert_not_called()
@@ -0,0 +1,48 @@
+from itertools import combinations
+from random import Random
+from unittest import TestCase
+from core.game import Category, DECK, Player, Partie, Deal
+from core.odds import declaration_odds
+from core.players import Rabelais
+
+
+def declaration(mask, category):
+    player = Player('Marcus')
+    player.draw([DECK[i] for i in range(32) if mask >> i & 1])
+    return player.declare(category)
+
+
+class TestOdds(TestCase):
+
+    def test_against_enumeration(self):
+        rng = Random(3)
+        for _ in range(2):
+            cards = rng.sample(range(32), 25)
+            hand = sum(1 << card for card in cards[:12])
+            unseen = cards[12:]
+            for category in Category.categories:
+                mine = declaration(hand, category)
+                counts = {'better': 0, 'equal': 0, 'worse': 0}
+                for theirs in combinations(unseen, 6):
+                    result = declaration(sum(1 << card for card in theirs), category)
+                    counts['equal' if result == mine else 'worse' if result < mine else 'better'] += 1
+                total = sum(counts.values())
+                odds = declaration_odds(category, hand, sum(1 << card for card in unseen), 6)
+                for outcome, count in counts.items():
+                    self.assertAlmostEqual(odds[outcome], count / total)
+
+    def test_rabelais(self):
+        p1 = Rabelais('Marcus')
+        p2 = Rabelais('Vergil')
+        d = Deal(Partie(p1, p2), p1, p2)
+        d.deal()
+        odds = p1.declaration_odds()
+        self.assertEquals(set(odds), set(Category.categories))
+        for chances in odds.values():
+            self.assertAlmostEqual(sum(chances.values()), 1)
+
+    def test_results_are_copies(self):
+        hand, unseen = sum(1 << i for i in range(12)), sum(1 << i for i in range(12, 32))
+        odds = declaration_odds(Category.POINT, hand, unseen)
+        odds['better'] = 2
+        self.assertNotEqual(declaration_odds(Category.POINT, hand, unseen)['better'], 2)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from functools import partial
+from unittest import TestCase
+
+import numpy as np
+
+from core.dataset import LEAD, FOLLOW
+from core.game import DECK
+from core.players import Descartes
+from core.policy import Policy, BatchedPolicy, features, play_tables, FEATURES
+from core.simulation import play_parties
+
+
+class TestPolicy(TestCase):
+
+    def test_features(self):
+        encoded = features([LEAD, FOLLOW], [0b101, 1 << 31], [0b111, 1 << 31 | 1], [-1, 4])
+        self.assertEquals(encoded.shape, (2, FEATURES))
+        self.assertEquals(list(np.flatnonzero(encoded[0])), [0, 2, 32, 33, 34, 96 + LEAD])
+        self.assertEquals(list(np.flatnonzero(encoded[1])), [31, 32, 63, 68, 96 + FOLLOW])
+
+    def test_weights_file(self):
+        policy = Policy.random((16,), np.random.default_rng(0))
+        encoded = features([LEAD], [0xFFF], [0xFFF], [-1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'policy.npz')
+            policy.save(path)
+            loaded = Policy.load(path)
+            player = Descartes('Marcus', weights=path)
+        self.assertTrue(np.array_equal(loaded.forward(encoded), policy.forward(encoded)))
+        self.assertEquals(len(player.policy.layers), 2)
+        with self.assertRaises(ValueError):
+            Policy([(np.zeros((10, 32)), np.zeros(32))])
+
+    def test_exchange(self):
+        scores = np.ones(32)
+        scores[[0, 1, 2, 3, 4, 5, 6]] = [-3, -1, -2, -5, -4, -6, -7]
+        player = Descartes('Marcus', policy=Policy.random())
+        player.draw([DECK[i] for i in range(12)])
+        self.assertEquals([card.index for card in player.exchange(scores, 5)], [6, 5, 3, 4, 0])
+        self.assertEquals([card.index for card in player.exchange(scores, 8)], [6, 5, 3, 4, 0, 2, 1])
+        self.assertEquals(player.exchange(scores, 0), [])
+
+    def test_batched_play(self):
+        policy = Policy.random((32,), np.random.default_rng(1))
+        entrants = [(partial(Descartes, policy=policy), 'Marcus'), (partial(Descartes, policy=policy), 'Vergil')]
+        expected = play_parties(entrants, 4, seed=3)
+
+        with BatchedPolicy(policy) as batched:
+            entrants = [(partial(Descartes, policy=batched), name) for _, name in entrants]
+            tally = play_tables(entrants, 4, tables=4, seed=3)
+            self.assertEquals(batched.evaluated, 26 * tally['deals'])
+        self.assertEquals(tally['wins'], expected['wins'])
+        self.assertEquals(tally['score'], expected['score'])
@@ -1,5 +1,8 @@
+import gc
+import weakref
 from unittest import TestCase
-from core.game import Partie, Deck, Deal, Rank, Suit, Card, all_cards, Result, Category
+from core.game import Partie, Deck, Deal, DealSummary, Rank, Suit, Card, all_cards, Result, Category
+from core.game import HOLDING_LENGTH, HOLDING_PIPS, HOLDING_RUN, HOLDING_RUN_TOP
 from core.players import Rabelais
 
 
@@ -10,6 +13,17 @@ def new_deal():
     return Deal(p, p1, p2)
 
 
+def play_deal(deal):
+    deal.deal()
+    lead, follow = deal.elder, deal.younger
+    while lead.hand:
+        lead_card = lead.get_lead()
+        follow_card = follow.get_follow(lead_card)
+        result = deal.play_trick({'player': lead, 'card': lead_card}, {'player': follow, 'card': follow_card})
+        if result['winner'] is not lead:
+            lead, follow = follow, lead
+
+
 class TestClasses(TestCase):
 
     def test_card(self):
@@ -165,3 +179,77 @@ class TestClasses(TestCase):
         assert len(d.elder.hand) == len(d.younger.hand) == 12
         self.assertEquals(len(d.deck.cards), 0)
         self.assertEquals(len(d.discards[d.elder] + d.discards[d.younger]), 8)
+
+    def test_bitboard(self):
+        d = new_deal()
+        d.deal()
+        for player in d.players:
+            self.assertEquals(player.mask, sum(card.bit for card in player.hand.values()))
+            for suit in Suit.suits:
+                self.assertEquals(player.has_suit(suit), bool(player.get_suit(suit)))
+                self.assertEquals(player.get_suit(suit), sorted(c for c in player.hand.values() if c.suit == suit))
+
+        d.exchange(d.elder, list(d.elder.hand.values())[0:5])
+        self.assertEquals(d.elder.mask, sum(card.bit for card in d.elder.hand.values()))
+        self.assertEquals(bin(d.elder.mask).count('1'), 12)
+
+    def test_holding_tables(self):
+        holding = 0b01110111  # Seven, Eight, Nine, Jack, Queen, King
+        self.assertEquals(HOLDING_LENGTH[holding], 6)
+        self.assertEquals(HOLDING_PIPS[holding], 7 + 8 + 9 + 10 + 10 + 10)
+        self.assertEquals(HOLDING_RUN[holding], 3)
+        self.assertEquals(HOLDING_RUN_TOP[holding], 2)
+        self.assertEquals(HOLDING_RUN[0b11011110], 4)
+        self.assertEquals(HOLDING_RUN_TOP[0b11011110], 4)
+
+    def test_interned_cards(self):
+        ace_diamonds = Card(Rank.Ace, Suit.DIAMONDS)
+        self.assertIs(ace_diamonds, Card(Rank.Ace, Suit.DIAMONDS))
+        self.assertIs(all_cards()[7], ace_diamonds)
+        self.assertEquals(ace_diamonds.hash(), 'AD')
+        self.assertEquals(ace_diamonds.value, 14)
+        with self.assertRaises(AttributeError):
+            ace_diamonds.rank = Rank.King
+
+    def test_declaration_cache(self):
+        d = new_deal()
+        d.deal()
+        p = d.elder
+        point = p.point
+        self.assertIs(p.declare(Category.POINT), point)
+        self.assertEquals(p.cache_info(), {'hits': 1, 'misses': 1})
+
+        d.exchange(p, [point.point_suit[0]] if point.first else list(p.hand.values())[0:1])
+        self.assertEquals(p.point.first, p.get_point().first)
+        self.assertEquals(p.cache_info()['misses'], 2)
+
+    def test_deal_history(self):
+        p1 = Rabelais('Marcus')
+        p2 = Rabelais('Vergil')
+        for keep_history in (False, True):
+            partie = Partie(p1, p2, keep_history=keep_history)
+            deal = partie.new_deal()
+            play_deal(deal)
+
+            self.assertIsNone(p1.deal)
+            self.assertEquals(len(partie.deals), 1)
+            summary = partie.deals[0]
+            if keep_history:
+                self.assertIs(summary, deal)
+            else:
+                self.assertIsInstance(summary, DealSummary)
+            self.assertEquals(summary.score, partie.score)
+            self.assertEquals(sum(summary.tricks.values()), 12)
+            self.assertIs(summary.elder, deal.elder)
+
+        # Without the history, nothing is left holding on to a finished deal.
+        gc.disable()
+        try:
+            partie = Partie(p1, p2)
+            deal = partie.new_deal()
+            play_deal(deal)
+            finished = weakref.ref(deal)
+            del deal
+            self.assertIsNone(finished())
+        finally:
+            gc.enable()
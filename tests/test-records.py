@@ -0,0 +1,52 @@
+import os
+import tempfile
+from random import Random
+from unittest import TestCase
+from core.players import Rabelais
+from core.records import (rank_permutation, unrank_permutation, encode_deal, decode_deal, replay_deal,
+                          replay_partie, RecordReader, RECORD_SIZE)
+from core.simulation import HeadlessServer, simulate
+
+
+def by_name(score):
+    return {player.name: points for player, points in score.items()}
+
+
+class TestRecords(TestCase):
+
+    def test_permutation_rank(self):
+        rng = Random(1)
+        for _ in range(20):
+            order = list(range(32))
+            rng.shuffle(order)
+            self.assertEquals(unrank_permutation(rank_permutation(order)), order)
+        self.assertEquals(rank_permutation(list(range(32))), 0)
+        self.assertEquals(rank_permutation(list(range(31, -1, -1))).bit_length(), 118)
+
+    def test_replay(self):
+        players = (Rabelais('Marcus'), Rabelais('Vergil'))
+        server = HeadlessServer(*players)
+        server.partie.keep_history = True
+        server.play_a_game()
+        records = [decode_deal(encode_deal(deal, players)) for deal in server.partie.deals]
+
+        replayed = replay_partie(records, (Rabelais('Marcus'), Rabelais('Vergil')))
+        self.assertEquals(len(replayed.deals), len(server.partie.deals))
+        # Cards compare equal by rank alone, so compare their indices, and
+        # scores by the name of the player seated.
+        for original, copy in zip(server.partie.deals, replayed.deals):
+            self.assertEquals(by_name(original.score), by_name(copy.score))
+            self.assertEquals([card.index for card in original.order], [card.index for card in copy.order])
+            self.assertEquals([(lead.index, follow.index) for lead, follow in original.plays],
+                              [(lead.index, follow.index) for lead, follow in copy.plays])
+        self.assertEquals(by_name(server.partie.score), by_name(replayed.score))
+
+    def test_record_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'deals')
+            tally = simulate([(Rabelais, 'Marcus'), (Rabelais, 'Vergil')], 2, workers=1, record=path)
+            self.assertEquals(os.path.getsize(path), RECORD_SIZE * tally['deals'])
+            with RecordReader(path) as reader:
+                self.assertEquals(len(reader), 12)
+                deal = replay_deal(reader[-1], (Rabelais('Marcus'), Rabelais('Vergil')))
+                self.assertEquals(sum(deal.tricks.values()), 12)
@@ -0,0 +1,179 @@
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from unittest import TestCase
+from core.canonical import permute
+from core.game import Partie, Deal, DECK, Card, Rank, Suit
+from core.players import Rabelais, Montaigne
+from core.search import search
+from core.simulation import HeadlessServer
+from core.solver import Solver, solve_deal
+from core.tricks import TrickState, CardTracker, cards, follows
+
+
+def new_deal(player1, player2):
+    return Deal(Partie(player1, player2), player1, player2)
+
+
+class TestTricks(TestCase):
+
+    def test_trick_state_scores_like_deal(self):
+        rng = Random(3)
+        for _ in range(50):
+            d = new_deal(Rabelais('Marcus'), Rabelais('Vergil'))
+            d.deal()
+            d.score_declarations()
+            players = [d.elder, d.younger]
+            state = TrickState([p.mask for p in players], 0, [d.score[p] for p in players],
+                               pique=bool(d.repique))
+            lead = 0
+            while state.hands[lead]:
+                lead_card = DECK[rng.choice(cards(state.hands[lead]))]
+                follow_card = DECK[rng.choice(cards(follows(state.hands[1 - lead], lead_card.index)))]
+                state.play(lead_card.index)
+                state.play(follow_card.index)
+                result = d.play_trick({'player': players[lead], 'card': lead_card},
+                                      {'player': players[1 - lead], 'card': follow_card})
+                lead = players.index(result['winner'])
+                self.assertEquals(state.leader, lead)
+            self.assertEquals(state.score, [d.score[p] for p in players])
+
+    def test_card_tracker(self):
+        tracker = CardTracker()
+        self.assertEquals(tracker.highest_outstanding(Suit.HEARTS), 7)
+        for rank in (Rank.Ace, Rank.King, Rank.Jack):
+            tracker.see(Card(rank, Suit.HEARTS))
+        self.assertEquals(tracker.unseen(Suit.HEARTS), 0b00101111)
+        self.assertEquals(tracker.highest_outstanding(Suit.HEARTS), 5)
+
+        # Holding the Ace and Jack, only the Ace is sure to win.
+        self.assertEquals(tracker.winners(0b10010000, Suit.HEARTS), 0b10000000)
+        tracker.see(Card(Rank.Queen, Suit.HEARTS))
+        self.assertEquals(tracker.winners(0b10010000, Suit.HEARTS), 0b10010000)
+        self.assertEquals(tracker.highest_outstanding(Suit.SPADES), 7)
+
+
+def minimax(state):
+    if state.finished:
+        return state.score[0] - state.score[1]
+    values = []
+    for move in cards(state.moves()):
+        child = state.copy()
+        child.play(move)
+        values.append(minimax(child))
+    return max(values) if state.to_move == 0 else min(values)
+
+
+class TestSolver(TestCase):
+
+    def test_small_positions(self):
+        rng = Random(4)
+        for _ in range(100):
+            n = rng.randint(1, 3)
+            dealt = rng.sample(range(32), 2 * n)
+            hands = (sum(1 << c for c in dealt[:n]), sum(1 << c for c in dealt[n:]))
+            score = (rng.choice([0, 12, 29]), rng.choice([0, 3, 29]))
+            won = rng.randint(0, 12 - n)
+            tricks = (won, 12 - n - won)
+            leader = rng.randint(0, 1)
+            expected = minimax(TrickState(hands, leader, score, tricks)) - (score[0] - score[1])
+            result = Solver(table_bits=12).solve(hands, leader, score, tricks)
+            self.assertEquals(result['value'], expected)
+            self.assertEquals(result['score'][0] - result['score'][1] - (score[0] - score[1]), expected)
+
+    def test_short_position(self):
+        # Two cards each and no tricks taken: a deal of two tricks.
+        hands = (1 << 7 | 1 << 6, 1 << 5 | 1 << 4)
+        result = Solver(table_bits=10).solve(hands, 0)
+        self.assertEquals(result['tricks'], (2, 0))
+        self.assertEquals(result['value'], 2 + 1 + 10)
+        self.assertEquals(len(result['play']), 2)
+
+    def test_canonical_solver(self):
+        rng = Random(6)
+        plain, canonical = Solver(table_bits=12), Solver(table_bits=12, canonical=True)
+        for _ in range(20):
+            dealt = rng.sample(range(32), 8)
+            hands = (sum(1 << c for c in dealt[:4]), sum(1 << c for c in dealt[4:]))
+            expected = plain.solve(hands, 0, (0, 0), (4, 4))['value']
+            for twin in ((0, 1, 2, 3), (3, 1, 0, 2), (1, 2, 3, 0)):
+                twins = (permute(hands[0], twin), permute(hands[1], twin))
+                result = canonical.solve(twins, 0, (0, 0), (4, 4))
+                self.assertEquals(result['value'], expected)
+                self.assertEquals(len(result['play']), 4)
+
+    def test_solve_deal(self):
+        d = new_deal(Rabelais('Marcus'), Rabelais('Vergil'))
+        d.deal()
+        d.score_declarations()
+        result = solve_deal(d, d.elder)
+        self.assertEquals(len(result['play']), 12)
+        self.assertEquals(sum(result['tricks'].values()), 12)
+        self.assertEquals(result['score'][d.elder] - result['score'][d.younger],
+                          d.score[d.elder] - d.score[d.younger] + result['value'])
+
+
+class TestMontaigne(TestCase):
+
+    def test_limits(self):
+        with self.assertRaises(ValueError):
+            Montaigne('Marcus', iterations=None)
+        d = new_deal(Montaigne('Marcus', iterations=0, seed=1), Rabelais('Vergil'))
+        d.deal()
+        info = d.elder.information()
+        for iterations, time_budget in ((0, None), (None, 1e-9)):
+            statistics = search(info, iterations, time_budget, seed=1)
+            self.assertEquals(sum(visits for visits, _ in statistics.values()), 1)
+        with self.assertRaises(ValueError):
+            search(info)
+
+    def test_fewer_iterations_than_workers(self):
+        server = HeadlessServer(Montaigne('Marcus', iterations=1, workers=2, seed=1), Rabelais('Vergil'))
+        server.play_a_game()
+        self.assertEquals(len(server.partie.deals), 6)
+
+    def test_pool_shut_down(self):
+        pools = []
+
+        class Pooled(Montaigne):
+            def choose(self, legal, lead_card=None):
+                move = super().choose(legal, lead_card)
+                if self.executor not in pools:
+                    pools.append(self.executor)
+                return move
+
+        player = Pooled('Marcus', iterations=4, workers=2, seed=1)
+        HeadlessServer(player, Rabelais('Vergil')).play_a_game()
+        self.assertIsNone(player.executor)
+        self.assertTrue(any(pools))
+        for pool in pools:
+            if pool:
+                with self.assertRaises(RuntimeError):
+                    pool.submit(int)
+
+        with Montaigne('Marcus', workers=2) as player:
+            player.executor = ProcessPoolExecutor(max_workers=1)
+        self.assertIsNone(player.executor)
+
+    def test_search(self):
+        d = new_deal(Montaigne('Marcus', iterations=50, seed=1), Rabelais('Vergil'))
+        d.deal()
+        info = d.elder.information()
+        statistics = search(info, iterations=50, seed=1)
+        self.assertEquals(sum(visits for visits, _ in statistics.values()), 50)
+        self.assertTrue(all(DECK[move].code in d.elder.hand for move in statistics))
+
+    def test_play(self):
+        d = new_deal(Montaigne('Marcus', iterations=20, seed=1), Montaigne('Vergil', iterations=20, seed=2))
+        d.deal()
+        lead, follow = d.elder, d.younger
+        while lead.hand:
+            lead_card = lead.get_lead()
+            follow.register(lead, lead_card)
+            follow_card = follow.get_follow(lead_card)
+            self.assertTrue(follow_card.suit == lead_card.suit or not follow.has_suit(lead_card.suit))
+            lead.register(follow, follow_card, lead=lead_card)
+            winner = d.play_trick({'player': lead, 'card': lead_card},
+                                  {'player': follow, 'card': follow_card})['winner']
+            if winner is not lead:
+                lead, follow = follow, lead
+        self.assertEquals(sum(d.tricks.values()), 12)
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import TestCase
+from core.game import Player
+from core.players import Rabelais
+from core.records import encode_deal
+from core.simulation import simulate, chunk_sizes, replay_game
+
+ENTRANTS = [(Rabelais, 'Barry Lyndon'), (Rabelais, 'Rabelais')]
+
+
+class Plain(Player):
+    """
+    Keeps the cards it is dealt and plays a legal card at random.
+    """
+    listens = False
+
+    def register(self, player, card, silent=True, lead=None):
+        pass
+
+    def get_elder_exchange(self):
+        return []
+
+    def get_younger_exchange(self, max_cards):
+        return []
+
+    def get_lead(self):
+        return self.rng.choice(list(self.hand.values()))
+
+    def get_follow(self, lead_card):
+        suited = [card for card in self.hand.values() if card.suit == lead_card.suit]
+        return self.rng.choice(suited or list(self.hand.values()))
+
+
+class TestSimulation(TestCase):
+
+    def test_chunk_sizes(self):
+        self.assertEquals(chunk_sizes(10, 4), [3, 3, 2, 2])
+        self.assertEquals(chunk_sizes(2, 8), [1, 1])
+
+    def test_simulate(self):
+        tally = simulate(ENTRANTS, 6, workers=1)
+        self.assertEquals(tally['parties'], 6)
+        self.assertEquals(tally['deals'], 36)
+        self.assertEquals(sum(tally['wins'].values()), 6)
+
+    def test_simulate_pool(self):
+        tally = simulate(ENTRANTS, 6, workers=2)
+        self.assertEquals(tally['parties'], 6)
+        self.assertEquals(sum(tally['wins'].values()), 6)
+
+    def test_seeded_runs(self):
+        tally = simulate(ENTRANTS, 4, workers=1, seed=2015)
+        self.assertEquals(simulate(ENTRANTS, 4, workers=2, seed=2015), tally)
+        self.assertNotEqual(simulate(ENTRANTS, 4, workers=1, seed=2016), tally)
+
+    def test_seeded_plain_players(self):
+        entrants = [(Plain, 'Barry Lyndon'), (Rabelais, 'Rabelais')]
+        tally = simulate(entrants, 2, workers=1, seed=2015)
+        self.assertEquals(tally['parties'], 2)
+        self.assertEquals(simulate(entrants, 2, workers=1, seed=2015), tally)
+
+    def test_replay_game(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'deals')
+            simulate(ENTRANTS, 3, workers=1, record=path, seed=7)
+            with open(path, 'rb') as f:
+                recorded = f.read()
+
+        server = replay_game(ENTRANTS, 7, 2)
+        replayed = b''.join(encode_deal(deal, server.seats) for deal in server.partie.deals)
+        self.assertEquals(recorded[-len(replayed):], replayed)
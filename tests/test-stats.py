@@ -0,0 +1,44 @@
+import statistics
+from random import Random
+from unittest import TestCase
+from core.players import Rabelais
+from core.simulation import simulate
+from core.stats import RunningStat, FixedHistogram
+
+
+class TestStats(TestCase):
+
+    def test_running_stat(self):
+        rng = Random(5)
+        values = [rng.randrange(-50, 300) for _ in range(1000)]
+        whole, first, second = RunningStat(), RunningStat(), RunningStat()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (first if i % 3 else second).add(value)
+
+        self.assertAlmostEqual(whole.mean, statistics.mean(values))
+        self.assertAlmostEqual(whole.variance, statistics.variance(values))
+        self.assertEquals((whole.min, whole.max), (min(values), max(values)))
+        self.assertEquals(first.merge(second), whole)
+        self.assertEquals(RunningStat().merge(whole), whole)
+
+    def test_histogram(self):
+        histogram = FixedHistogram(0, 30, 3)
+        for value in (-1, 0, 9, 10, 29, 30, 100):
+            histogram.add(value)
+        self.assertEquals(histogram.summary(), [(None, 1), (0, 2), (10, 1), (20, 1), (30, 2)])
+        with self.assertRaises(ValueError):
+            histogram.merge(FixedHistogram(0, 40, 3))
+
+    def test_simulation_statistics(self):
+        entrants = [(Rabelais, 'Marcus'), (Rabelais, 'Vergil')]
+        tally = simulate(entrants, 6, workers=1, seed=11)
+        result = tally['statistics'].summary()
+
+        self.assertEquals(result['deals'], 36)
+        self.assertEquals(result['parties'], 6)
+        self.assertEquals(tally['statistics'].final_scores.sum, sum(tally['final_score'].values()))
+        self.assertEquals(tally['statistics'].rubicons, tally['rubicons'])
+        for counts in result['declarations'].values():
+            self.assertAlmostEqual(sum(counts.values()), 1)
+        self.assertEquals(simulate(entrants, 6, workers=2, seed=11)['statistics'], tally['statistics'])
@@ -0,0 +1,57 @@
+from math import log10
+from unittest import TestCase
+from core.players import Rabelais
+from core.tournament import Tournament, bradley_terry, sprt
+
+
+class Careless(Rabelais):
+    """
+    Keeps the cards it is dealt and leads at random.
+    """
+
+    def get_elder_exchange(self):
+        return []
+
+    def get_younger_exchange(self, max_cards):
+        return []
+
+    def get_lead(self):
+        return self.rng.choice(list(self.hand.values()))
+
+
+class TestTournament(TestCase):
+
+    def test_sprt(self):
+        self.assertEquals(sprt(10, 10)[0], 0)
+        self.assertEquals(sprt(40, 10, 0, 100)[0], 1)
+        self.assertEquals(sprt(10, 40, 0, 100)[0], -1)
+        self.assertEquals(sprt(500, 500)[0], -1)
+
+    def test_bradley_terry(self):
+        ratings = bradley_terry(['a', 'b'], [[0, 75], [25, 0]], prior=0)
+        self.assertAlmostEqual(ratings['a']['elo'] - ratings['b']['elo'], 400 * log10(3), places=4)
+        self.assertAlmostEqual(ratings['a']['elo'], -ratings['b']['elo'])
+        self.assertLess(ratings['a']['low'], ratings['a']['elo'])
+
+        ratings = bradley_terry(['a', 'b', 'c'], [[0, 10, 0], [0, 0, 10], [0, 0, 0]])
+        self.assertGreater(ratings['a']['elo'], ratings['b']['elo'])
+        self.assertGreater(ratings['b']['elo'], ratings['c']['elo'])
+
+    def test_round_robin(self):
+        entrants = [(Rabelais, 'Marcus'), (Rabelais, 'Vergil'), (Careless, 'Careless')]
+        results = Tournament(entrants, max_games=60, batch=10, elo=100, seed=1).run(workers=1)
+        pairings = results['pairings']
+        self.assertEquals(set(pairings), {('Marcus', 'Vergil'), ('Marcus', 'Careless'), ('Vergil', 'Careless')})
+        for result in pairings.values():
+            self.assertEquals(sum(result['wins']), result['games'])
+            self.assertTrue(result['games'] <= 60)
+        self.assertEquals(pairings[('Marcus', 'Careless')]['stronger'], 'Marcus')
+        self.assertTrue(pairings[('Marcus', 'Careless')]['games'] < 60)
+        ratings = results['ratings']
+        self.assertLess(ratings['Careless']['elo'], min(ratings['Marcus']['elo'], ratings['Vergil']['elo']))
+
+    def test_workers(self):
+        entrants = [(Rabelais, 'Marcus'), (Rabelais, 'Vergil')]
+        serial = Tournament(entrants, max_games=20, batch=5, seed=3).run(workers=1)
+        pooled = Tournament(entrants, max_games=20, batch=5, seed=3).run(workers=2)
+        self.assertEquals(serial, pooled)
@@ -0,0 +1,52 @@
+from random import Random
+from unittest import TestCase
+import numpy as np
+from core.game import Partie, Deal, Category, all_cards
+from core.players import Rabelais
+from core import vectorized
+
+
+def random_deals(count, seed=0):
+    rng = Random(seed)
+    for _ in range(count):
+        p1 = Rabelais('Marcus')
+        p2 = Rabelais('Vergil')
+        d = Deal(Partie(p1, p2), p1, p2)
+        cards = rng.sample(all_cards(), 24)
+        d.elder.draw(cards[:12])
+        d.younger.draw(cards[12:])
+        yield d
+
+
+class TestVectorized(TestCase):
+
+    def test_declarations(self):
+        deals = list(random_deals(300))
+        masks = np.array([d.elder.mask for d in deals], dtype=np.uint32)
+        for category in Category.categories:
+            scored = vectorized.declare(masks, category)
+            for i, d in enumerate(deals):
+                result = d.elder.declare(category)
+                self.assertEquals(scored['first'][i], result.first)
+                self.assertEquals(scored['value'][i], result.value)
+                if category == Category.POINT:
+                    self.assertEquals(scored['second'][i], result.second)
+                elif result.second:
+                    self.assertEquals(scored['second'][i], result.second[0][0].rank.value)
+
+    def test_boolean_hands(self):
+        deals = list(random_deals(10))
+        masks = np.array([d.elder.mask for d in deals], dtype=np.uint32)
+        bits = (masks[:, None] >> np.arange(32, dtype=np.uint32)) & 1
+        self.assertTrue((vectorized.as_masks(bits.astype(bool)) == masks).all())
+
+    def test_score_declarations(self):
+        deals = list(random_deals(300, seed=1))
+        elder = np.array([d.elder.mask for d in deals], dtype=np.uint32)
+        younger = np.array([d.younger.mask for d in deals], dtype=np.uint32)
+        scored = vectorized.score_declarations(elder, younger)
+        for i, d in enumerate(deals):
+            d.score_declarations()
+            self.assertEquals(scored['elder'][i], d.score[d.elder])
+            self.assertEquals(scored['younger'][i], d.score[d.younger])
+            self.assertEquals(scored['repique'][i] == 1, d.repique is d.elder)